@@ -0,0 +1,69 @@
+"""
+Check that the fused backend computes the same filter steps as the NumPy stages.
+"""
+import numpy as np
+
+from dataclasses import dataclass
+
+from World.RandomStreams import RandomStreams
+from World.Initializer import UniformPositionNormalVelocityInitializer
+from Filter import ParticleSet
+from Filter.Observation import MultiBallObservationModel
+from Filter.FusedKernel import fused_available
+from Simulation import SimulationParameters, FilterEngine, generate_scenario
+
+@dataclass
+class ConformanceResult:
+    particles: int
+    balls: int
+    steps: int
+    state_deviation: float # largest absolute particle state difference of a step
+    weight_deviation: float # largest weight difference of a step, relative to the largest weight
+    passed: bool
+
+def check_backends(N: int = 10000, M: int = 3, steps: int = 20, seed: int = 0, tolerance: float = 1e-9) -> ConformanceResult:
+    """
+    Step a NumPy and a fused ParticleSet through the same generated scenario.
+
+    Both draw the same velocity noise, so after every resample and
+    transition_observe the particles and weights have to agree up to
+    round-off. The fused set is then reset to the NumPy one, so every
+    step is compared on its own (no drift through resampling).
+
+    Raises:
+      RuntimeError: if Numba is not installed
+    """
+    if not fused_available():
+        raise RuntimeError("the fused backend needs numba")
+
+    p = SimulationParameters(number_of_balls = M, assumed_number_of_balls = M, number_of_particles = N, seed = seed, max_steps = steps, live_show = False)
+    scenario = generate_scenario(p)
+    engine = FilterEngine(p) # only for the assumed world and models
+    process = engine.particle_set.process
+    observation_model = MultiBallObservationModel(np.array(p.assumed_sensor_variance, dtype=float))
+    initializer = UniformPositionNormalVelocityInitializer(np.diag(p.assumed_initial_velocity_variance).astype(float), engine.assumed_world)
+
+    sets = [
+        ParticleSet(N, initializer, process, engine.assumed_deterministic_process, observation_model, RandomStreams(seed), array_backed = True, backend = backend)
+        for backend in ("numpy", "fused")
+    ]
+
+    state_deviation, weight_deviation = 0.0, 0.0
+    for observations in scenario.observations:
+        for s in sets:
+            s.resample()
+            s.transition_observe(scenario.delta, list(observations))
+        reference, fused = sets
+        state_deviation = max(state_deviation, float(np.abs(reference.particles - fused.particles).max()))
+        weight_deviation = max(weight_deviation, float(np.abs(reference.weights - fused.weights).max() / reference.weights.max()))
+        fused.particles[...] = reference.particles
+        fused.weights[...] = reference.weights
+
+    return ConformanceResult(
+        particles = N,
+        balls = M,
+        steps = len(scenario.observations),
+        state_deviation = state_deviation,
+        weight_deviation = weight_deviation,
+        passed = state_deviation <= tolerance * max(p.width, p.height) and weight_deviation <= tolerance
+    )
@@ -0,0 +1,82 @@
+"""
+Accuracy and speed of the float32 filter compared to float64 on fixed seeds.
+"""
+import json
+import time
+import numpy as np
+
+from dataclasses import dataclass, asdict, replace
+from typing import Sequence
+
+from Simulation import SimulationParameters, FilterEngine, Scenario, generate_scenario
+from Simulation.ParameterSweep import tracking_error
+
+@dataclass
+class PrecisionResult:
+    seed: int
+    particles: int
+    balls: int
+    steps: int
+    error_float64: float # mean tracking error of the float64 filter
+    error_float32: float # mean tracking error of the float32 filter
+    estimate_deviation: float # mean distance between the float32 and float64 estimates
+    seconds_float64: float # filter time per step
+    seconds_float32: float
+    non_finite_weights: int # steps where the float32 weights were not all finite
+
+def _run(p: SimulationParameters, scenario: Scenario) -> tuple[list[list[np.ndarray]], list[float], float, int]:
+    engine = FilterEngine(p)
+    estimates, errors, non_finite = [], [], 0
+    start = time.perf_counter()
+    try:
+        for (states, observations) in zip(scenario.truth, scenario.observations):
+            estimated_states = engine.update(list(observations))
+            estimates.append(estimated_states)
+            errors.append(tracking_error(states, estimated_states))
+            non_finite += int(not np.all(np.isfinite(engine.particle_set.weights)))
+    finally:
+        engine.close()
+    seconds = (time.perf_counter() - start) / max(len(errors), 1)
+    return estimates, errors, seconds, non_finite
+
+def compare_precision(p: SimulationParameters, seeds: Sequence[int] = (0, 1, 2)) -> list[PrecisionResult]:
+    """
+    Run the filter in float64 and float32 on the same scenario
+    (truth and observations generated once per seed).
+
+    The two runs drift apart after the first resampling step that picks
+    different particles, so the per-dtype tracking errors are the numbers
+    to compare, the estimate deviation shows how far apart the runs end up.
+
+    Parameters:
+      p: parameters of the runs (dtype is overridden)
+      seeds: seeds to run
+    """
+    results = []
+    for seed in seeds:
+        q = replace(p, seed = seed, live_show = False, show_summary_plots = False)
+        scenario = generate_scenario(q)
+        estimates64, errors64, seconds64, _ = _run(replace(q, dtype = "float64"), scenario)
+        estimates32, errors32, seconds32, non_finite = _run(replace(q, dtype = "float32"), scenario)
+
+        deviation = np.mean([
+            tracking_error(np.asarray(e64, dtype=float), e32) for (e64, e32) in zip(estimates64, estimates32)
+        ]) if estimates64 else 0.0
+
+        results.append(PrecisionResult(
+            seed = seed,
+            particles = q.number_of_particles,
+            balls = q.number_of_balls,
+            steps = len(errors64),
+            error_float64 = float(np.mean(errors64)) if errors64 else 0.0,
+            error_float32 = float(np.mean(errors32)) if errors32 else 0.0,
+            estimate_deviation = float(deviation),
+            seconds_float64 = seconds64,
+            seconds_float32 = seconds32,
+            non_finite_weights = non_finite
+        ))
+    return results
+
+def save_precision_results(path: str, results: list[PrecisionResult]):
+    with open(path, "w") as f:
+        json.dump({"results": [asdict(r) for r in results]}, f, indent=2)
@@ -0,0 +1,141 @@
+"""
+Timing and memory of the single condensation stages and of
+a full simulation step, across particle and ball counts.
+"""
+import json
+import platform
+import time
+import tracemalloc
+import numpy as np
+
+from dataclasses import dataclass, asdict
+from typing import Callable, Optional, Sequence
+
+from Simulation import SimulationParameters, SimulationEngine
+from Simulation.FilterEngine import ESTIMATORS
+
+STAGES: list[str] = ["resample", "transition", "observe", "transition_observe", "estimate", "step"]
+
+@dataclass
+class BenchmarkResult:
+    stage: str
+    particles: int
+    balls: int
+    seconds: float # median wall time of one call
+    throughput: float # particles per second
+    peak_memory: int # bytes allocated at peak during one call
+
+def _measure(fn: Callable[[], object], repeats: int) -> tuple[float, int]:
+    """
+    Median wall time over repeats calls (after one warm up call)
+    and the peak traced memory of one additional call.
+    """
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return float(np.median(times)), int(peak)
+
+def _parameters(N: int, M: int, seed: int, estimator: str, backend: str) -> SimulationParameters:
+    return SimulationParameters(
+        number_of_balls = M,
+        assumed_number_of_balls = M,
+        number_of_particles = N,
+        seed = seed,
+        estimator = estimator,
+        backend = backend,
+        live_show = False
+    )
+
+def benchmark_stages(N: int, M: int, stages: Sequence[str] = STAGES, repeats: int = 5, seed: int = 0, estimator: str = "kmeans", backend: str = "numpy") -> list[BenchmarkResult]:
+    """
+    Benchmark the given stages for N particles and M balls.
+
+    The filter is set up the way the SimulationEngine does it and run for a
+    few steps first, so the particles are clustered around the balls.
+    """
+    engine = SimulationEngine(_parameters(N, M, seed, estimator, backend))
+    for _ in range(3):
+        engine.step()
+
+    particle_set = engine.particle_set
+    observations = engine.sensor.sense(engine.states)
+    delta = engine.delta
+    est = ESTIMATORS[estimator](engine.assumed_world)
+
+    calls: dict[str, Callable[[], object]] = {
+        "resample": particle_set.resample,
+        "transition": lambda: particle_set.transition(delta),
+        "observe": lambda: particle_set.observe(observations),
+        "transition_observe": lambda: particle_set.transition_observe(delta, observations),
+        "estimate": lambda: est.estimate(M, particle_set),
+        "step": engine.step
+    }
+
+    results = []
+    try:
+        for stage in stages:
+            seconds, peak = _measure(calls[stage], repeats)
+            results.append(BenchmarkResult(stage, N, M, seconds, N / seconds if seconds > 0 else float("inf"), peak))
+    finally:
+        engine.close()
+    return results
+
+def run_benchmarks(particle_counts: Sequence[int], ball_counts: Sequence[int], stages: Sequence[str] = STAGES, repeats: int = 5, seed: int = 0, estimator: str = "kmeans", log: Optional[Callable[[BenchmarkResult], None]] = None, backend: str = "numpy") -> list[BenchmarkResult]:
+    """
+    Benchmark every stage for every (particle count, ball count) combination.
+    """
+    results = []
+    for N in particle_counts:
+        for M in ball_counts:
+            for result in benchmark_stages(N, M, stages, repeats, seed, estimator, backend):
+                if log is not None:
+                    log(result)
+                results.append(result)
+    return results
+
+def save_results(path: str, results: list[BenchmarkResult], **meta):
+    """
+    Write results (and some information about the machine) as json.
+    """
+    document = {
+        "meta": dict(
+            python = platform.python_version(),
+            numpy = np.__version__,
+            machine = platform.machine(),
+            processor = platform.processor(),
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **meta
+        ),
+        "results": [asdict(r) for r in results]
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+def load_results(path: str) -> list[BenchmarkResult]:
+    with open(path) as f:
+        return [BenchmarkResult(**r) for r in json.load(f)["results"]]
+
+def compare_results(baseline: list[BenchmarkResult], current: list[BenchmarkResult], tolerance: float = 0.1) -> list[tuple[BenchmarkResult, BenchmarkResult]]:
+    """
+    Find regressions: entries that got slower by more than tolerance
+    (relative) compared to the baseline entry with the same stage, N and M.
+
+    Returns:
+      list of (baseline, current) pairs that regressed
+    """
+    old = {(r.stage, r.particles, r.balls): r for r in baseline}
+    regressions = []
+    for r in current:
+        b = old.get((r.stage, r.particles, r.balls))
+        if b is not None and r.seconds > b.seconds * (1 + tolerance):
+            regressions.append((b, r))
+    return regressions
@@ -0,0 +1,66 @@
+"""
+Start-up time of short headless runs, measured in fresh interpreters.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+from dataclasses import dataclass, asdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES: list[str] = ["sklearn", "scipy", "pygame", "matplotlib"]
+
+# imports the simulation, runs a few headless steps and reports
+# how long that took and which heavy modules got imported on the way
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from Simulation import SimulationParameters, SimulationEngine
+imported = time.perf_counter()
+engine = SimulationEngine(SimulationParameters(live_show = False, number_of_particles = {particles}, estimator = "{estimator}"))
+engine.run({steps})
+done = time.perf_counter()
+print(json.dumps(dict(
+    import_seconds = imported - start,
+    run_seconds = done - imported,
+    heavy_modules = [m for m in {heavy} if m in sys.modules]
+)))
+"""
+
+@dataclass
+class StartupResult:
+    estimator: str
+    steps: int
+    process_seconds: float # median wall time of the whole interpreter run
+    import_seconds: float # median time to import the simulation package
+    run_seconds: float # median time to set up and run the steps
+    heavy_modules: list[str] # heavy dependencies that got imported
+
+def benchmark_startup(estimator: str = "lloyd", steps: int = 10, particles: int = 1000, repeats: int = 5) -> StartupResult:
+    """
+    Launch repeats fresh interpreters that each do a short headless run.
+    """
+    script = _SCRIPT.format(particles = particles, estimator = estimator, steps = steps, heavy = HEAVY_MODULES)
+    process_times, reports = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", script], cwd = ROOT, capture_output = True, text = True, check = True)
+        process_times.append(time.perf_counter() - start)
+        reports.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    return StartupResult(
+        estimator = estimator,
+        steps = steps,
+        process_seconds = float(np.median(process_times)),
+        import_seconds = float(np.median([r["import_seconds"] for r in reports])),
+        run_seconds = float(np.median([r["run_seconds"] for r in reports])),
+        heavy_modules = reports[-1]["heavy_modules"]
+    )
+
+def save_startup_results(path: str, results: list[StartupResult]):
+    with open(path, "w") as f:
+        json.dump({"results": [asdict(r) for r in results]}, f, indent=2)
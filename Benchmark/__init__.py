@@ -0,0 +1,21 @@
+from .StageBenchmark import BenchmarkResult, benchmark_stages, run_benchmarks, save_results, load_results, compare_results
+from .StartupBenchmark import StartupResult, benchmark_startup, save_startup_results
+from .PrecisionReport import PrecisionResult, compare_precision, save_precision_results
+from .BackendConformance import ConformanceResult, check_backends
+
+__all__: list[str] = [
+    "BenchmarkResult",
+    "benchmark_stages",
+    "run_benchmarks",
+    "save_results",
+    "load_results",
+    "compare_results",
+    "StartupResult",
+    "benchmark_startup",
+    "save_startup_results",
+    "PrecisionResult",
+    "compare_precision",
+    "save_precision_results",
+    "ConformanceResult",
+    "check_backends"
+]
@@ -0,0 +1,21 @@
+"""
+Optimal assignment (minimum cost matching) between two sets.
+"""
+import numpy as np
+
+def linear_sum_assignment(cost: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Solve the rectangular linear assignment problem
+    (scipy.optimize.linear_sum_assignment, compiled).
+
+    Parameters:
+      cost: (n, m) cost matrix (finite values)
+
+    Returns:
+      (rows, columns): min(n, m) matched index pairs, sorted by row
+    """
+    # scipy (installed with sklearn) is only imported when something is assigned
+    from scipy.optimize import linear_sum_assignment as solve # type: ignore
+
+    rows, columns = solve(np.asarray(cost, dtype=float))
+    return rows.astype(np.int64), columns.astype(np.int64)
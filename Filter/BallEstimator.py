@@ -5,9 +5,9 @@ ParticleSet.
 import numpy as np
 
 from .ParticleSet import ParticleSet
-from sklearn.cluster import KMeans # type: ignore
 
 class BallEstimator:
+    last_iterations: int = 0 # clustering iterations of the last estimate
 
     def __init__(self):
         pass
@@ -25,12 +25,16 @@ class BallEstimator:
         Inside each cluster, we then use a weighted average to get
         the ball velocities.
         """
-        X = np.array(particle_set.particles)
-        w = np.array(particle_set.weights)
+        # sklearn is only imported when this backend is actually used
+        from sklearn.cluster import KMeans # type: ignore
+
+        X = np.asarray(particle_set.particles)
+        w = np.asarray(particle_set.weights)
 
         # clustering only positions proved more robust
         clf = KMeans(n_clusters = N, random_state = 0, n_init="auto").fit(X[:,:2], sample_weight = w)
 
+        self.last_iterations = int(clf.n_iter_)
         labels = clf.labels_
         positions = clf.cluster_centers_
 
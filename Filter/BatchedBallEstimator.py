@@ -0,0 +1,93 @@
+"""
+estimate Ball Positions and Velocities for every
+filter of a BatchedParticleSet.
+"""
+import numpy as np
+from typing import Optional
+
+from .BatchedParticleSet import BatchedParticleSet
+from .LloydBallEstimator import LloydBallEstimator
+
+class BatchedBallEstimator:
+    iterations: int
+    tol: float
+    centers: Optional[np.ndarray]
+    last_iterations: int
+
+    def __init__(self, iterations: int = 5, tol: float = 1e-3, seed: int = 0):
+        """
+        LloydBallEstimator over the batch axis: warm-started weighted
+        k-means, one vectorized Lloyd iteration for all K filters.
+
+        Slice k gives the same estimate as a LloydBallEstimator with the
+        same parameters on filter k (filters that converged stop moving
+        while the others keep iterating).
+
+        Parameters:
+          iterations: maximum number of Lloyd iterations per call
+          tol: a filter stops once none of its centers moves further than this
+          seed: seed for the k-means++ initialization of the first call
+        """
+        self.iterations = iterations
+        self.tol = tol
+        self.seed = seed
+        self.centers = None
+        self.last_iterations = 0
+        self._seeding = LloydBallEstimator(iterations, tol, seed)
+
+    def _bincount(self, labels: np.ndarray, weights: np.ndarray, M: int) -> np.ndarray:
+        """
+        Per filter weighted bincount of (K, N) labels in [0, M), as one call.
+        """
+        K = labels.shape[0]
+        offset = labels + np.arange(K)[:, None] * M
+        return np.bincount(offset.ravel(), weights=weights.ravel(), minlength=K * M).reshape(K, M)
+
+    def estimate(self, M: int, particle_set: BatchedParticleSet) -> np.ndarray:
+        """
+        Estimate M ball states for each of the K filters.
+
+        Returns:
+          (K, M, 4) estimated ball states
+        """
+        X = particle_set.particles
+        w = particle_set.weights
+        K = X.shape[0]
+        positions = X[:, :, :2]
+
+        if self.centers is None or self.centers.shape[:2] != (K, M):
+            # seeding is done once per filter, the same way LloydBallEstimator does it
+            self.centers = np.array([self._seeding._initial_centers(M, positions[k], w[k]) for k in range(K)])
+        centers = self.centers
+
+        active = np.ones(K, dtype=bool)
+        labels = np.zeros((K, X.shape[1]), dtype=np.int64)
+        mass = np.zeros((K, M))
+        self.last_iterations = 0
+        for _ in range(max(self.iterations, 1)):
+            new_labels = np.argmin(np.sum((positions[:, :, None, :] - centers[:, None, :, :]) ** 2, axis=3), axis=2)
+            labels[active] = new_labels[active]
+            new_mass = self._bincount(labels, w, M)
+            mass[active] = new_mass[active]
+            new_centers = np.stack([self._bincount(labels, w * positions[:, :, dim], M) for dim in range(2)], axis=2)
+            # empty clusters keep their old center
+            filled = mass > 0
+            new_centers[filled] /= mass[filled, None]
+            new_centers[~filled] = centers[~filled]
+
+            shift = np.max(np.abs(new_centers - centers), axis=(1, 2))
+            centers = np.where(active[:, None, None], new_centers, centers)
+            self.last_iterations += 1
+            active &= ~(shift < self.tol)
+            if not active.any():
+                break
+
+        self.centers = centers
+
+        # velocity is average velocity in cluster (labels of the last assignment)
+        velocities = np.stack([self._bincount(labels, w * X[:, :, dim], M) for dim in (2, 3)], axis=2)
+        filled = mass > 0
+        velocities[filled] /= mass[filled, None]
+        velocities[~filled] = 0
+
+        return np.concatenate((centers, velocities), axis=2)
@@ -0,0 +1,163 @@
+"""
+K independent particle filters stacked into one (K, N, 4) array.
+"""
+import numpy as np
+from typing import Optional, Sequence, TypeVar, Union
+
+from World import stack_world_information
+from World.RandomStreams import RandomStreams
+from World.Initializer import BaseInitializer
+from World.Process import StochasticBallArenaProcess, ball_arena_transition
+from .Observation import MultiBallObservationModel
+from .Resampling import BaseResampler, MultinomialResampler
+
+T = TypeVar('T')
+
+def _per_filter(value: Union[T, Sequence[T]], K: int) -> list[T]:
+    """
+    Repeat a single component K times, or check that there is one per filter.
+    """
+    if isinstance(value, (list, tuple)):
+        if len(value) != K:
+            raise RuntimeError(f"expected one component per filter ({K}), got {len(value)}")
+        return list(value)
+    return [value] * K
+
+class BatchedParticleSet:
+    particles: np.ndarray
+    weights: np.ndarray
+    streams: list[RandomStreams]
+    resampler: BaseResampler
+    ess_threshold: Optional[float]
+    K: int
+    N: int
+
+    def __init__(self, N: int, initializer: Union[BaseInitializer, Sequence[BaseInitializer]], process: Union[StochasticBallArenaProcess, Sequence[StochasticBallArenaProcess]], observation_model: Union[MultiBallObservationModel, Sequence[MultiBallObservationModel]], seeds: Sequence[Union[int, RandomStreams]], resampler: Optional[BaseResampler] = None, ess_threshold: Optional[float] = None, dtype: np.dtype = np.float64):
+        """
+        K = len(seeds) ball particle filters that are stepped together.
+
+        Slice k behaves exactly like an array backed ParticleSet built from the
+        k-th components and seeds[k] (with process.internal_process as its
+        deterministic process), so every slice can be checked against a
+        standalone run. Only the random draws are done per filter, everything
+        else is one vectorized call over the batch axis.
+
+        Parameters:
+          N: the number of particles per filter
+          initializer: initializer (shared, or one per filter)
+          process: stochastic transition model (shared, or one per filter), each
+            filter may assume different world parameters and velocity noise
+          observation_model: particle weighting (shared, or one per filter)
+          seeds: seed (or streams) of each filter
+          resampler: resampling scheme (multinomial if not given)
+          ess_threshold: see ParticleSet (checked per filter)
+          dtype: see ParticleSet
+        """
+        self.K = len(seeds)
+        self.N = N
+        self.streams = [s if isinstance(s, RandomStreams) else RandomStreams(int(s)) for s in seeds]
+        self.resampler = resampler if resampler is not None else MultinomialResampler()
+        self.ess_threshold = ess_threshold
+
+        initializers = _per_filter(initializer, self.K)
+        processes = _per_filter(process, self.K)
+        models = _per_filter(observation_model, self.K)
+
+        self.world = stack_world_information([p.internal_process.world_information for p in processes])
+        self.tol = processes[0].internal_process.tol
+        self.velocity_variances = np.array([p.vel_variance for p in processes], dtype=float)
+        # (K, 2, 2), transposed so positions @ whitening_t whitens each filter's positions
+        self.whitening_t = np.array([m.whitening.T for m in models], dtype=dtype)
+
+        self.particles = np.array([
+            initializers[k].generate_batch(N, rng)
+            for (k, rng) in enumerate(s.generator("initialize") for s in self.streams)
+        ], dtype=dtype)
+        self._buffer = np.empty_like(self.particles)
+        self.weights = np.full((self.K, N), 1/N, dtype=dtype)
+
+    def effective_sample_size(self) -> np.ndarray:
+        """
+        (K,) effective sample size of each filter.
+        """
+        return 1 / np.einsum("kn,kn->k", self.weights, self.weights)
+
+    def resample(self) -> np.ndarray:
+        """
+        Resample all filters (one gather over the whole batch).
+
+        Returns:
+          (K,) bool, which filters were actually resampled
+        """
+        resampled = np.ones(self.K, dtype=bool)
+        if self.ess_threshold is not None:
+            resampled = self.effective_sample_size() < self.ess_threshold * self.N
+
+        weights = np.asarray(self.weights, dtype=float)
+        if weights is not self.weights:
+            weights /= weights.sum(axis=1, keepdims=True) # float32 weights only sum to 1 up to float32 rounding
+
+        indices = np.empty((self.K, self.N), dtype=np.int64)
+        for k in range(self.K):
+            indices[k] = self.resampler.indices(weights[k], self.N, self.streams[k].generator("resample")) if resampled[k] else np.arange(self.N)
+
+        # gather over the flattened batch, filter k's particles start at k * N
+        indices += np.arange(self.K)[:, None] * self.N
+        np.take(self.particles.reshape(-1, 4), indices.ravel(), axis=0, out=self._buffer.reshape(-1, 4))
+        self.particles, self._buffer = self._buffer, self.particles
+        self.weights[resampled] = 1/self.N
+        return resampled
+
+    def transition(self, delta: float = 1, deterministic: bool = False):
+        """
+        Transition all filters, each with its own world parameters.
+
+        Parameters:
+          delta: time step length
+          deterministic: skip the velocity noise
+        """
+        if not deterministic:
+            for k in range(self.K):
+                rng = self.streams[k].generator("transition")
+                self.particles[k, :, 2:] += rng.multivariate_normal(np.zeros(2), np.diag(self.velocity_variances[k]), size = self.N)
+
+        ball_arena_transition(self.particles, delta, self.world, self.tol)
+
+    def observe(self, observation: Union[list[np.ndarray], np.ndarray], active: Optional[np.ndarray] = None):
+        """
+        Weight all filters.
+
+        Parameters:
+          observation: either M (x, y) observations shared by all filters,
+            or a (K, M, 2) array with separate observations per filter
+          active: optional (K,) bool, filters that are not active keep their weights
+        """
+        o = np.asarray(observation, dtype=self.particles.dtype)
+        if o.size == 0:
+            return
+        if o.ndim == 2:
+            o = np.broadcast_to(o, (self.K,) + o.shape)
+
+        # same computation as MultiBallObservationModel, with a batch axis in front
+        p = self.particles[:, :, :2] @ self.whitening_t
+        o = o @ self.whitening_t
+
+        d = o[:, :, 0, None] - p[:, None, :, 0]
+        likelihoods = d * d
+        d = o[:, :, 1, None] - p[:, None, :, 1]
+        likelihoods += d * d
+        likelihoods *= -0.5
+
+        likelihoods -= likelihoods.max(axis=2, keepdims=True)
+        np.exp(likelihoods, out=likelihoods)
+        likelihoods /= likelihoods.sum(axis=2, keepdims=True)
+        likelihoods = likelihoods.mean(axis=1)
+        if active is not None:
+            likelihoods[~active] = 1/self.N
+
+        self.weights *= likelihoods
+        total = self.weights.sum(axis=1)
+        lost = ~(total > 0)
+        self.weights[lost] = likelihoods[lost]
+        total[lost] = self.weights[lost].sum(axis=1)
+        self.weights /= total[:, None]
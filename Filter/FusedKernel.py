@@ -0,0 +1,149 @@
+"""
+Fused transition and weighting of ball particles, compiled with Numba
+when it is installed (the NumPy stages are the fallback).
+"""
+import math
+import numpy as np
+
+from typing import Any, Callable, Optional
+
+from World.WorldInformation import BallWorldInformation
+
+def _transition_evaluate(particles: np.ndarray, noise: np.ndarray, delta: float, world: np.ndarray, tol: float, whitening_t: np.ndarray, observations: np.ndarray, maxima: np.ndarray, sums: np.ndarray):
+    """
+    One pass over the particles: velocity noise, ball arena physics (same
+    operations as ball_arena_transition) and the running log-sum-exp of
+    every observation's log likelihoods (observations are whitened).
+    """
+    width = world[0]
+    height = world[1]
+    radius = world[2]
+    bounce = world[3]
+    air = world[4]
+    ground = world[5]
+    gravity = world[6]
+    M = observations.shape[0]
+    for m in range(M):
+        maxima[m] = -np.inf
+        sums[m] = 0.0
+
+    for n in range(particles.shape[0]):
+        vx = particles[n, 2] + noise[n, 0]
+        vy = particles[n, 3] + noise[n, 1]
+        x = particles[n, 0] + vx * delta
+        y = particles[n, 1] + vy * delta
+
+        if y + radius > height:
+            y = height - radius
+            vy = -vy * bounce
+        if y - radius < 0:
+            y = radius
+            vy = -vy * bounce
+        if x + radius > width:
+            x = width - radius
+            vx = -vx * bounce
+        if x - radius < 0:
+            x = radius
+            vx = -vx * bounce
+
+        vx *= air
+        vy *= air
+        vy -= gravity * delta
+        if abs(y - radius - 0) < tol:
+            vx *= ground
+            vy *= ground
+
+        particles[n, 0] = x
+        particles[n, 1] = y
+        particles[n, 2] = vx
+        particles[n, 3] = vy
+
+        px = x * whitening_t[0, 0] + y * whitening_t[1, 0]
+        py = x * whitening_t[0, 1] + y * whitening_t[1, 1]
+        for m in range(M):
+            dx = observations[m, 0] - px
+            dy = observations[m, 1] - py
+            l = -0.5 * (dx * dx + dy * dy)
+            if l > maxima[m]:
+                sums[m] = sums[m] * math.exp(maxima[m] - l) + 1.0
+                maxima[m] = l
+            else:
+                sums[m] += math.exp(l - maxima[m])
+
+def _weigh(particles: np.ndarray, whitening_t: np.ndarray, observations: np.ndarray, maxima: np.ndarray, sums: np.ndarray, weights: np.ndarray, likelihoods: np.ndarray) -> float:
+    """
+    Second pass: likelihood of every particle (mean over the observations of
+    the row normalized by its log-sum-exp), multiplied into the weights.
+
+    Returns:
+      sum of the new (unnormalized) weights
+    """
+    M = observations.shape[0]
+    total = 0.0
+    for n in range(particles.shape[0]):
+        px = particles[n, 0] * whitening_t[0, 0] + particles[n, 1] * whitening_t[1, 0]
+        py = particles[n, 0] * whitening_t[0, 1] + particles[n, 1] * whitening_t[1, 1]
+        acc = 0.0
+        for m in range(M):
+            dx = observations[m, 0] - px
+            dy = observations[m, 1] - py
+            acc += math.exp(-0.5 * (dx * dx + dy * dy) - maxima[m]) / sums[m]
+        likelihoods[n] = acc / M
+        weights[n] *= likelihoods[n]
+        total += weights[n]
+    return total
+
+_KERNELS: Optional[tuple[Callable[..., Any], Callable[..., Any]]] = None
+
+def fused_available() -> bool:
+    """
+    Wether Numba is installed (the fused kernel is only used compiled).
+    """
+    try:
+        import numba # type: ignore # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _kernels() -> tuple[Callable[..., Any], Callable[..., Any]]:
+    # compiled on first use, numba is only imported here
+    global _KERNELS
+    if _KERNELS is None:
+        import numba # type: ignore
+        _KERNELS = (
+            numba.njit(cache=True)(_transition_evaluate),
+            numba.njit(cache=True)(_weigh)
+        )
+    return _KERNELS
+
+def world_vector(w: BallWorldInformation, delta: float) -> np.ndarray:
+    """
+    The world parameters in the order the kernel expects them
+    (air and ground discount already raised to delta).
+    """
+    return np.array([w.width, w.height, w.ball_radius, w.bounce_discount, w.air_discount ** delta, w.ground_discount ** delta, w.gravity], dtype=float)
+
+def fused_transition_observe(particles: np.ndarray, weights: np.ndarray, likelihoods: np.ndarray, noise: np.ndarray, delta: float, w: BallWorldInformation, tol: float, whitening: np.ndarray, observation: np.ndarray) -> float:
+    """
+    Transition the particles in place and multiply their observation
+    likelihoods into the weights, in two compiled passes over the particles
+    (no (M, N) likelihood matrix, no per-stage temporaries).
+
+    Parameters:
+      particles: (N, 4) ball states, transitioned in place
+      weights: (N,) weights, multiplied in place
+      likelihoods: (N,) receives the likelihoods
+      noise: (N, 2) velocity noise
+      whitening: inverse cholesky factor of the observation covariance
+      observation: (M, 2) observations (M > 0)
+
+    Returns:
+      sum of the new (unnormalized) weights
+    """
+    transition_evaluate, weigh = _kernels()
+    whitening_t = np.ascontiguousarray(whitening.T, dtype=float)
+    observations = np.ascontiguousarray(np.asarray(observation, dtype=float).reshape(-1, 2) @ whitening_t)
+    maxima = np.empty(len(observations))
+    sums = np.empty(len(observations))
+    transition_evaluate(particles, noise, delta, world_vector(w, delta), tol, whitening_t, observations, maxima, sums)
+    return weigh(particles, whitening_t, observations, maxima, sums, weights, likelihoods)
@@ -0,0 +1,98 @@
+"""
+estimate Ball Positions and Velocities from
+ParticleSet by finding peaks in a weighted histogram.
+"""
+import numpy as np
+
+from World import BallWorldInformation
+from .ParticleSet import ParticleSet
+from .BallEstimator import BallEstimator
+
+class GridBallEstimator(BallEstimator):
+    world: BallWorldInformation
+    cell_size: float
+    radius: float
+
+    def __init__(self, world: BallWorldInformation, cell_size: float = 1.0, radius: float = 4.0):
+        """
+        Histogram based mode extraction.
+
+        Cheaper than clustering (linear in the particle count, no iterative
+        fitting), works well as long as the balls are further apart than radius.
+
+        Parameters:
+          world: (assumed) world, the grid covers width x height of it
+          cell_size: edge length of one grid cell
+          radius: particles closer than this to a peak contribute to
+            its estimate, peaks closer than this are suppressed
+        """
+        self.world = world
+        self.cell_size = cell_size
+        self.radius = radius
+        self.shape = (
+            max(int(np.ceil(world.width / cell_size)), 1),
+            max(int(np.ceil(world.height / cell_size)), 1)
+        )
+
+    def _histogram(self, positions: np.ndarray, w: np.ndarray) -> np.ndarray:
+        """
+        Weighted particle histogram, smoothed with a separable [1, 2, 1] kernel.
+        """
+        bx, by = self.shape
+        ix = np.clip((positions[:, 0] / self.cell_size).astype(np.int64), 0, bx - 1)
+        iy = np.clip((positions[:, 1] / self.cell_size).astype(np.int64), 0, by - 1)
+        hist = np.bincount(ix * by + iy, weights=w, minlength=bx * by).reshape(bx, by)
+
+        padded = np.pad(hist, 1)
+        hist = padded[:-2, :] + 2 * padded[1:-1, :] + padded[2:, :]
+        hist = hist[:, :-2] + 2 * hist[:, 1:-1] + hist[:, 2:]
+        return hist
+
+    def _peaks(self, N: int, hist: np.ndarray) -> np.ndarray:
+        """
+        Greedily pick the N highest cells, suppressing the
+        neighbourhood of every picked cell.
+
+        Returns:
+          (N, 2) peak positions (cell centers in world coordinates)
+        """
+        hist = hist.copy()
+        r = int(np.ceil(self.radius / self.cell_size))
+        peaks = np.empty((N, 2))
+        for k in range(N):
+            i, j = np.unravel_index(np.argmax(hist), hist.shape)
+            peaks[k] = ((i + 0.5) * self.cell_size, (j + 0.5) * self.cell_size)
+            hist[max(i - r, 0):i + r + 1, max(j - r, 0):j + r + 1] = -np.inf
+        return peaks
+
+    def estimate(self, N: int, particle_set: ParticleSet) -> list[np.ndarray]:
+        """
+        Estimate N ball states from particle set.
+
+        Bin the weighted particle positions into an arena sized grid, take the
+        N strongest (smoothed) peaks and use the weighted mean position and
+        velocity of the particles within radius of each peak.
+        """
+        X = np.asarray(particle_set.particles)
+        w = np.asarray(particle_set.weights)
+        positions = X[:, :2]
+
+        peaks = self._peaks(N, self._histogram(positions, w))
+
+        d2 = np.sum((positions[:, None, :] - peaks[None, :, :]) ** 2, axis=2)
+        labels = np.argmin(d2, axis=1)
+        near = np.take_along_axis(d2, labels[:, None], axis=1)[:, 0] <= self.radius ** 2
+        labels = labels[near]
+        wn = w[near]
+
+        mass = np.bincount(labels, weights=wn, minlength=N)
+        sums = np.stack([
+            np.bincount(labels, weights=wn * X[near, dim], minlength=N) for dim in range(4)
+        ], axis=1)
+
+        # peaks without any weight nearby fall back to the cell center, resting
+        output = np.concatenate((peaks, np.zeros((N, 2))), axis=1)
+        filled = mass > 0
+        output[filled] = sums[filled] / mass[filled, None]
+
+        return list(output)
@@ -0,0 +1,95 @@
+"""
+estimate Ball Positions and Velocities from
+ParticleSet with a warm-started weighted k-means.
+"""
+import numpy as np
+from typing import Optional
+
+from .ParticleSet import ParticleSet
+from .BallEstimator import BallEstimator
+
+class LloydBallEstimator(BallEstimator):
+    iterations: int
+    tol: float
+    centers: Optional[np.ndarray]
+    last_iterations: int
+
+    def __init__(self, iterations: int = 5, tol: float = 1e-3, seed: int = 0):
+        """
+        Weighted K-Means in plain NumPy, seeded with the cluster centers
+        of the previous call.
+
+        The balls barely move between two steps, so a few Lloyd iterations
+        starting from the old centers are enough (no restarts needed).
+
+        Parameters:
+          iterations: maximum number of Lloyd iterations per call
+          tol: stop early once no center moves further than this
+          seed: seed for the k-means++ initialization of the first call
+        """
+        self.iterations = iterations
+        self.tol = tol
+        self.seed = seed
+        self.centers = None
+        self.last_iterations = 0
+
+    def _initial_centers(self, N: int, X: np.ndarray, w: np.ndarray) -> np.ndarray:
+        """
+        Weighted k-means++ seeding.
+        """
+        rng = np.random.default_rng(self.seed)
+        centers = np.empty((N, X.shape[1]))
+        centers[0] = X[rng.choice(len(X), p = w / w.sum())]
+        d2 = np.sum((X - centers[0]) ** 2, axis=1)
+        for k in range(1, N):
+            p = w * d2
+            total = p.sum()
+            idx = rng.choice(len(X), p = p / total) if total > 0 else rng.integers(len(X))
+            centers[k] = X[idx]
+            d2 = np.minimum(d2, np.sum((X - centers[k]) ** 2, axis=1))
+        return centers
+
+    def estimate(self, N: int, particle_set: ParticleSet) -> list[np.ndarray]:
+        """
+        Estimate N ball states from particle set.
+
+        Same idea as BallEstimator (weighted k-means on the positions, weighted
+        average velocity inside each cluster), but each Lloyd iteration is one
+        distance computation and a few weighted bincount reductions.
+        """
+        X = np.asarray(particle_set.particles)
+        w = np.asarray(particle_set.weights)
+        positions = X[:, :2]
+
+        if self.centers is None or len(self.centers) != N:
+            self.centers = self._initial_centers(N, positions, w)
+        centers = self.centers
+
+        self.last_iterations = 0
+        for _ in range(max(self.iterations, 1)):
+            labels = np.argmin(np.sum((positions[:, None, :] - centers[None, :, :]) ** 2, axis=2), axis=1)
+            mass = np.bincount(labels, weights=w, minlength=N)
+            new_centers = np.stack([
+                np.bincount(labels, weights=w * positions[:, dim], minlength=N) for dim in range(2)
+            ], axis=1)
+            # empty clusters keep their old center
+            filled = mass > 0
+            new_centers[filled] /= mass[filled, None]
+            new_centers[~filled] = centers[~filled]
+
+            shift = np.max(np.abs(new_centers - centers))
+            centers = new_centers
+            self.last_iterations += 1
+            if shift < self.tol:
+                break
+
+        self.centers = centers
+
+        # velocity is average velocity in cluster (labels of the last assignment)
+        velocities = np.stack([
+            np.bincount(labels, weights=w * X[:, dim], minlength=N) for dim in (2, 3)
+        ], axis=1)
+        velocities[filled] /= mass[filled, None]
+        velocities[~filled] = 0
+
+        return list(np.concatenate((centers, velocities), axis=1))
@@ -3,17 +3,20 @@ The Observation Model is responsible for weighting a
 particles likelihood given an observation.
 """
 
-from typing import TypeVar, Generic, Optional
+import numpy as np
+from typing import Callable, Iterable, TypeVar, Generic, Optional
+from World.RandomStreams import Seed
 
 S = TypeVar('S')
 O = TypeVar('O')
 
 class BaseObservationModel(Generic[S,O]):
+    separable: bool = False # offers partial_likelihoods / chunk_scales (see MultiBallObservationModel)
 
     def __init__(self):
         pass
 
-    def observe(self, states: list[S], observation: O, seed: int) -> list[float]:
+    def observe(self, states: list[S], observation: O, seed: Seed) -> list[float]:
         """
         Take in states and observation and produce weight for each
         sample.
@@ -21,3 +24,26 @@ class BaseObservationModel(Generic[S,O]):
         Weights are guaranteed to add up to one.
         """
         return [1/len(states)] * len(states)
+
+    def observe_array(self, states: np.ndarray, observation: O, seed: Seed) -> np.ndarray:
+        """
+        Like observe, but the states are stacked into one array
+        (one row per state) and the weights are returned as a vector.
+        """
+        return np.full(len(states), 1/len(states))
+
+    def observe_chunks(self, states: np.ndarray, observation: O, chunks: list[slice], seeds: list[Seed], map: Callable[..., Iterable] = map) -> np.ndarray:
+        """
+        Like observe_array, with the work split into chunks of states.
+
+        The models that support it evaluate the chunks through map (e.g. the
+        map of a thread pool) and combine the per-chunk results in chunk order,
+        so the weights only depend on the chunks, not on how many threads ran
+        them. Models that cannot be split just call observe_array.
+
+        Parameters:
+          chunks: slices of states that cover all states
+          seeds: seed (or Generator) of each chunk
+          map: runs a function over the chunks, like the builtin map
+        """
+        return self.observe_array(states, observation, seeds[0])
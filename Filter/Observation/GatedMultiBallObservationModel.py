@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Callable, Iterable
+from .MultiBallObservationModel import MultiBallObservationModel
+from World.RandomStreams import Seed
+
+class GatedMultiBallObservationModel(MultiBallObservationModel):
+    separable: bool = False
+    gate: float
+
+    def __init__(self, variances: np.ndarray, gate: float = 6.0):
+        """
+        Multi-Ball Observation model that only looks at particles
+        close to each observation.
+
+        The (whitened) particle positions are bucketed into a uniform grid
+        with cells of size gate / 2, each observation only evaluates the
+        particles in the 5x5 cells around it. Particles further than gate standard
+        deviations (mahalanobis distance) from an observation get no weight
+        from it. The cost is proportional to the number of nearby
+        (observation, particle) pairs instead of M * N. That pays off once the
+        gates cover only a small part of the arena (many balls that are far
+        apart compared to the sensor noise), otherwise the dense model is faster.
+
+        Parameters:
+          variances: see MultiBallObservationModel
+          gate: gating radius in standard deviations (exp(-gate^2 / 2) is the
+            largest relative likelihood that is cut off)
+        """
+        super().__init__(variances)
+        self.gate = gate
+
+    def _pairs(self, p: np.ndarray, o: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate (observation, particle) pairs: all particles in the 5x5
+        grid cells around each observation (ordered by observation).
+        """
+        r = 2 # cells per gate radius
+        cell_size = self.gate / r
+        cells = np.floor(p / cell_size).astype(np.int64)
+        origin = cells.min(axis=0)
+        cells -= origin
+        ny = int(cells[:, 1].max()) + 1
+        keys = cells[:, 0] * ny + cells[:, 1]
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        ocells = np.floor(o / cell_size).astype(np.int64) - origin
+        # one contiguous key range per neighbouring column: (M, 2r + 1)
+        columns = ocells[:, 0, None] + np.arange(-r, r + 1)[None, :]
+        low_y = np.clip(ocells[:, 1] - r, 0, ny - 1)[:, None]
+        high_y = np.clip(ocells[:, 1] + r, 0, ny - 1)[:, None]
+        outside = (ocells[:, 1, None] + r < 0) | (ocells[:, 1, None] - r > ny - 1)
+        starts = np.searchsorted(sorted_keys, columns * ny + low_y, side="left")
+        ends = np.searchsorted(sorted_keys, columns * ny + high_y, side="right")
+        ends = np.where(outside, starts, ends)
+
+        lengths = (ends - starts).ravel()
+        total = int(lengths.sum())
+        observation_index = np.repeat(np.repeat(np.arange(len(o)), 2 * r + 1), lengths)
+        # position inside each range, added to the range start
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        particle_index = order[np.repeat(starts.ravel(), lengths) + offsets]
+        return observation_index, particle_index
+
+    def observe_array(self, states: np.ndarray, observation: list[np.ndarray], seed: Seed) -> np.ndarray:
+        """
+        Same as MultiBallObservationModel.observe_array, but only the gated
+        pairs are evaluated and accumulated. Each observation still gives out
+        1/M weight (an observation without any particle inside its gate falls
+        back to weighting all particles).
+
+        Returns:
+          weights: (N,) weight vector (dtype of the states)
+        """
+        M = len(observation)
+        N = len(states)
+        if M == 0:
+            return np.full(N, 1/N, dtype=np.result_type(states.dtype, np.float32))
+
+        p, o = self._whiten(states, observation)
+
+        obs, idx = self._pairs(p, o)
+        d = o[obs] - p[idx]
+        log_likelihood = -0.5 * np.einsum("ij,ij->i", d, d)
+        inside = log_likelihood >= -0.5 * self.gate ** 2
+        obs, idx, log_likelihood = obs[inside], idx[inside], log_likelihood[inside]
+
+        counts = np.bincount(obs, minlength=M)
+        weights = np.zeros(N, dtype=p.dtype)
+        if len(obs) > 0:
+            # pairs are grouped by observation, so the maxima are segment reductions
+            present = counts > 0
+            segment_starts = (np.cumsum(counts) - counts)[present]
+            maxima = np.zeros(M, dtype=p.dtype)
+            maxima[present] = np.maximum.reduceat(log_likelihood, segment_starts)
+            e = np.exp(log_likelihood - maxima[obs])
+            e /= np.bincount(obs, weights=e, minlength=M)[obs] # normalize each observation by itself
+            weights += np.bincount(idx, weights=e, minlength=N)
+
+        empty = np.flatnonzero(counts == 0)
+        if len(empty) > 0:
+            dense = self.log_likelihoods(states, [observation[j] for j in empty])
+            dense -= dense.max(axis=1, keepdims=True)
+            np.exp(dense, out=dense)
+            dense /= dense.sum(axis=1, keepdims=True)
+            weights += dense.sum(axis=0)
+
+        return weights / M
+
+    def observe_chunks(self, states: np.ndarray, observation: list[np.ndarray], chunks: list[slice], seeds: list[Seed], map: Callable[..., Iterable] = map) -> np.ndarray:
+        """
+        The gated pairs are found over all particles at once, so
+        this is not split (same as observe_array).
+        """
+        return self.observe_array(states, observation, seeds[0])
@@ -1,9 +1,12 @@
 import numpy as np
-from typing import Callable, Optional
+from typing import Callable, Iterable, Optional
 from .BaseObservationModel import BaseObservationModel
+from World.RandomStreams import Seed
 
 class MultiBallObservationModel(BaseObservationModel):
+    separable: bool = True
     variances: np.ndarray
+    whitening: np.ndarray
 
     def __init__(self, variances: np.ndarray):
         """
@@ -13,14 +16,37 @@ class MultiBallObservationModel(BaseObservationModel):
           variances: variance in the statistical classifier (assume: normal distribution with mean at particle position)
             larger values will result in more equal weightings
             (how much uncertainty we assume to be in the observation process)
+            either shape (2,) (x and y variance) or a full (2,2) covariance matrix
         """
-        if variances.shape != (2,):
-            raise RuntimeError(f"observation variance must have shape (2,). got {variances.shape}")
-        self.variances = np.diag(variances)
-        self.icov = np.linalg.pinv(self.variances)
-        self.det = np.linalg.det(self.variances)
+        if variances.shape == (2,):
+            variances = np.diag(variances)
+        if variances.shape != (2, 2):
+            raise RuntimeError(f"observation variance must have shape (2,) or (2,2). got {variances.shape}")
+        self.variances = variances
+        self.whitening = self._whitening(variances)
 
-    def observe(self, states: list[np.ndarray], observation: list[np.ndarray], seed: int) -> list[float]:
+    @staticmethod
+    def _whitening(variances: np.ndarray) -> np.ndarray:
+        """
+        W with |W d|^2 = d^T pinv(variances) d, so the mahalanobis distance
+        is the squared length of the whitened difference.
+
+        The inverse cholesky factor (cov = L L^T) for a positive definite
+        covariance. A singular one (e.g. a zero variance) falls back to the
+        pseudo-inverse: directions without variance are ignored.
+        """
+        try:
+            return np.linalg.inv(np.linalg.cholesky(variances))
+        except np.linalg.LinAlgError:
+            pass
+        values, vectors = np.linalg.eigh(variances)
+        tol = max(values.max(initial=0.0), 1.0) * 1e-12
+        if (values < -tol).any():
+            raise RuntimeError(f"observation variance must be positive semi-definite. got {variances.tolist()}")
+        inverse_sqrt = np.where(values > tol, 1 / np.sqrt(np.maximum(values, tol)), 0.0)
+        return inverse_sqrt[:, None] * vectors.T
+
+    def observe(self, states: list[np.ndarray], observation: list[np.ndarray], seed: Seed) -> list[float]:
         """
         observations are a list of (x,y) tuples (we do NOT observe velocity)
 
@@ -34,13 +60,111 @@ class MultiBallObservationModel(BaseObservationModel):
         Returns:
           weights: weights for each state
         """
-        def weight_observation(p: np.ndarray, o: np.ndarray):
-            return (1/(np.sqrt(2*3.14159 * self.det)))*np.exp(-0.5*(o - p).dot(self.icov).dot(o - p))
+        return list(self.observe_array(np.array(states), observation, seed))
+
+    def _whiten(self, states: np.ndarray, observation: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Whitened (N, 2) particle positions and (M, 2) observations,
+        in the precision of the states (float32 states stay float32).
+        """
+        dtype = np.result_type(states.dtype, np.float32)
+        whitening_t = self.whitening.T.astype(dtype)
+        p = states[:, :2] @ whitening_t
+        o = np.asarray(observation, dtype=dtype).reshape(-1, 2) @ whitening_t
+        return p, o
+
+    def log_likelihoods(self, states: np.ndarray, observation: list[np.ndarray]) -> np.ndarray:
+        """
+        Unnormalized log pdf values of all observations for all particles.
+
+        The normalization constant of the normal distribution is left out,
+        it is the same for every particle and cancels when normalizing.
+
+        Returns:
+          (M, N) array, one row per observation
+        """
+        # whiten both sides once, then the mahalanobis distance is euclidean
+        p, o = self._whiten(states, observation)
+
+        d = o[:, 0, None] - p[None, :, 0]
+        m = d * d
+        d = o[:, 1, None] - p[None, :, 1]
+        m += d * d
+        m *= -0.5
+        return m
+
+    def observe_array(self, states: np.ndarray, observation: list[np.ndarray], seed: Seed) -> np.ndarray:
+        """
+        Same as observe, for an (N, 4) state array.
+
+        The normalization of each observation's row is done in the log domain
+        (log-sum-exp), so particles far away from every observation do not
+        underflow to 0/0. This also keeps float32 states safe, everything is
+        computed in the precision of the states.
+
+        Returns:
+          weights: (N,) weight vector (dtype of the states)
+        """
+        if len(observation) == 0:
+            return np.full(len(states), 1/len(states), dtype=np.result_type(states.dtype, np.float32))
+
+        weights = self.log_likelihoods(states, observation)
+        weights -= weights.max(axis=1, keepdims=True)
+        np.exp(weights, out=weights)
+        weights /= weights.sum(axis=1, keepdims=True) # normalize each row by itself
+
+        return weights.mean(axis=0)
+
+    def partial_likelihoods(self, states: np.ndarray, observation: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        First pass of the chunked evaluation, for one chunk of states.
+
+        Returns:
+          (M, n) likelihoods relative to the chunk's row maxima,
+          (M,) row maxima (log domain) and (M,) row sums
+        """
+        e = self.log_likelihoods(states, observation)
+        maxima = e.max(axis=1)
+        e -= maxima[:, None]
+        np.exp(e, out=e)
+        return e, maxima, e.sum(axis=1)
+
+    @staticmethod
+    def chunk_scales(maxima: list[np.ndarray], sums: list[np.ndarray]) -> list[np.ndarray]:
+        """
+        Second pass of the chunked evaluation: combine the row maxima and sums
+        of all chunks (in the given order) into the global log-sum-exp of
+        every observation.
+
+        Returns:
+          (M,) scale per chunk, its weights are scale @ (its partial likelihoods)
+        """
+        top = np.max(maxima, axis=0)
+        totals = np.zeros_like(top)
+        for (m, s) in zip(maxima, sums): # fixed order, whatever ran the chunks
+            totals += s * np.exp(m - top)
+        # mean over the observations of each row normalized by its global sum
+        return [np.exp(m - top) / (totals * len(top)) for m in maxima]
+
+    def observe_chunks(self, states: np.ndarray, observation: list[np.ndarray], chunks: list[slice], seeds: list[Seed], map: Callable[..., Iterable] = map) -> np.ndarray:
+        """
+        Same as observe_array, evaluated chunk by chunk
+        (see partial_likelihoods and chunk_scales). Both passes
+        over the chunks run through map.
+
+        Returns:
+          weights: (N,) weight vector (dtype of the states)
+        """
+        if len(observation) == 0:
+            return self.observe_array(states, observation, seeds[0])
+
+        partial = list(map(lambda chunk: self.partial_likelihoods(states[chunk], observation), chunks))
+        scales = self.chunk_scales([m for (_, m, _) in partial], [s for (_, _, s) in partial])
 
-        weights = np.array([[weight_observation(p[:2], o) for p in states] for o in observation])
-        for observation_index in range(len(observation)): # normalize each row by itself
-            weights[observation_index, :] = weights[observation_index, :] / weights[observation_index, :].sum()
+        weights = np.empty(len(states), dtype=partial[0][0].dtype)
+        def combine(i: int):
+            weights[chunks[i]] = scales[i] @ partial[i][0]
 
-        weights = np.mean(weights, axis=0)
-            
-        return list(weights)
+        for _ in map(combine, range(len(chunks))):
+            pass
+        return weights
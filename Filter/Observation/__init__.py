@@ -1,7 +1,9 @@
 from .BaseObservationModel import BaseObservationModel
 from .MultiBallObservationModel import MultiBallObservationModel
+from .GatedMultiBallObservationModel import GatedMultiBallObservationModel
 
 __all__: list[str] = [
     "BaseObservationModel",
-    "MultiBallObservationModel"
+    "MultiBallObservationModel",
+    "GatedMultiBallObservationModel"
 ]
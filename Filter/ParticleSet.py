@@ -1,25 +1,35 @@
 """
 Particle Filter implementation.
 """
+import time
 import numpy as np
-from typing import TypeVar, Generic
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar, Generic, Union, Optional
 from World.Initializer import BaseInitializer
-from World.Process import IdentityProcess
-from .Observation import BaseObservationModel
+from World.Process import IdentityProcess, StochasticBallArenaProcess
+from World.RandomStreams import RandomStreams
+from Instrumentation import BaseHook
+from .Observation import BaseObservationModel, MultiBallObservationModel
+from .FusedKernel import fused_available, fused_transition_observe
+from .Resampling import BaseResampler, MultinomialResampler
 
 S = TypeVar('S')
 O = TypeVar('O')
 
 class ParticleSet(Generic[S, O]):
-    particles: list[S]
-    weights: list[float]
+    particles: Union[list[S], np.ndarray]
+    weights: Union[list[float], np.ndarray]
     process: IdentityProcess
     deterministic_process: IdentityProcess
     observation_model: BaseObservationModel
-    seed: int
+    resampler: BaseResampler
+    ess_threshold: Optional[float]
+    hook: Optional[BaseHook]
+    streams: RandomStreams
     N: int
+    array_backed: bool
 
-    def __init__(self, N: int, initializer: BaseInitializer, process: IdentityProcess, deterministic_process: IdentityProcess, observation_model: BaseObservationModel, seed: int = 0):
+    def __init__(self, N: int, initializer: BaseInitializer, process: IdentityProcess, deterministic_process: IdentityProcess, observation_model: BaseObservationModel, seed: Union[int, RandomStreams] = 0, array_backed: bool = False, resampler: Optional[BaseResampler] = None, ess_threshold: Optional[float] = None, hook: Optional[BaseHook] = None, dtype: np.dtype = np.float64, threads: Optional[int] = None, chunk_size: int = 1 << 15, backend: str = "numpy"):
         """
         Initialize the Particle Filter.
 
@@ -35,31 +45,127 @@ class ParticleSet(Generic[S, O]):
           deterministic_process: state transition model to use in
            case of missing observations
           observation_model: particle weighting mechanism
-          seed: seed used for RNG for reproducibility
+          seed: seed used for RNG for reproducibility (or the streams to draw
+           from). Initialization, resampling, transition and observation each
+           draw from their own long-lived stream.
+          array_backed: keep the particles in one preallocated (N, d) array
+           and the weights in a vector instead of python lists. All steps then
+           work in place (via transition_array/observe_array), resampling
+           gathers into a second buffer that is swapped with the first one.
+          resampler: resampling scheme (multinomial if not given)
+          ess_threshold: if given, only resample when the effective sample size
+           drops below ess_threshold * N (otherwise resample every step)
+          hook: optional receiver of per-stage measurements (wall time,
+           effective sample size, weight entropy, unique particles), nothing
+           is measured if not given
+          dtype: float precision of the particles, weights and likelihoods
+           when array_backed (float32 halves the memory traffic of every stage)
+          threads: if given (and array_backed), transition and observe run on
+           chunks of chunk_size particles in a pool of this many threads (NumPy
+           releases the GIL inside its kernels). Every chunk draws from its own
+           stream and the chunk results are combined in chunk order, so the
+           particles and weights do not depend on the number of threads.
+          chunk_size: particles per chunk (small enough that a chunk's
+           likelihood rows stay in cache)
+          backend: "numpy", or "fused" to run transition_observe as one compiled
+           loop over the particles (see FusedKernel). Only used if Numba is
+           installed, for array backed, single threaded sets of ball particles
+           with a StochasticBallArenaProcess and a (dense) MultiBallObservationModel,
+           otherwise the NumPy stages run.
         """
         self.N = N
-        self.weights = [1/N] * N
-        self.particles = [initializer.generate(n, seed) for n in range(N)]
+        self.array_backed = array_backed
         self.process = process
         self.deterministic_process = deterministic_process
-        self.seed = seed
+        self.streams = seed if isinstance(seed, RandomStreams) else RandomStreams(seed)
         self.observation_model = observation_model
+        self.resampler = resampler if resampler is not None else MultinomialResampler()
+        self.ess_threshold = ess_threshold
+        self.hook = hook
 
-    def resample(self):
+        rng = self.streams.generator("initialize")
+        if array_backed:
+            self.weights = np.full(N, 1/N, dtype=dtype)
+            self.particles = np.array(initializer.generate_batch(N, rng), dtype=dtype)
+            self._buffer = np.empty_like(self.particles)
+        else:
+            self.weights = [1/N] * N
+            self.particles = [initializer.generate(n, rng) for n in range(N)]
+
+        self._fused = (
+            backend == "fused" and array_backed and threads is None
+            and isinstance(process, StochasticBallArenaProcess)
+            and isinstance(observation_model, MultiBallObservationModel) and observation_model.separable
+            and fused_available()
+        )
+        if self._fused:
+            self._likelihoods = np.empty_like(self.weights)
+
+        self._pool = None
+        if threads is not None and array_backed:
+            self._chunks = [slice(s, min(s + chunk_size, N)) for s in range(0, N, chunk_size)]
+            self._chunk_streams = self.streams.child("chunks").spawn(len(self._chunks))
+            self._pool = ThreadPoolExecutor(max_workers = threads)
+
+    def close(self):
+        """
+        Shut down the thread pool (if threads was given).
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def effective_sample_size(self) -> float:
+        """
+        Effective sample size 1 / sum(w^2) of the current weights.
+        (N for uniform weights, 1 if one particle carries all the weight)
+        """
+        w = np.asarray(self.weights)
+        return 1 / np.dot(w, w)
+
+    def weight_entropy(self) -> float:
+        """
+        Shannon entropy of the current weights (log(N) for uniform weights).
+        """
+        w = np.asarray(self.weights)
+        w = w[w > 0]
+        return float(-np.dot(w, np.log(w)))
+
+    def resample(self) -> bool:
         """
         Second step of condensation algorithm.
+
+        Returns:
+          wether the particles were actually resampled
+          (see ess_threshold)
         """
-        rng = np.random.default_rng(self.seed)
-        counts = rng.multinomial(self.N, self.weights)
-        
-        new_set = []
-        for (idx, c) in enumerate(counts):
-            new_set.extend([self.particles[idx]] * c)
-            
-        self.weights = [1/self.N] * self.N
-        self.particles = new_set
-        
-        self.seed += self.N
+        start = time.perf_counter() if self.hook is not None else 0.0
+
+        if self.ess_threshold is not None and self.effective_sample_size() >= self.ess_threshold * self.N:
+            if self.hook is not None:
+                self.hook.record("resample", {"seconds": time.perf_counter() - start, "resampled": False})
+            return False
+
+        weights = np.asarray(self.weights, dtype=float)
+        if weights is not self.weights and self.array_backed:
+            weights /= weights.sum() # float32 weights only sum to 1 up to float32 rounding
+        indices = self.resampler.indices(weights, self.N, self.streams.generator("resample"))
+
+        if self.array_backed:
+            np.take(self.particles, indices, axis=0, out=self._buffer)
+            self.particles, self._buffer = self._buffer, self.particles
+            self.weights.fill(1/self.N)
+        else:
+            self.weights = [1/self.N] * self.N
+            self.particles = [self.particles[idx] for idx in indices]
+
+        if self.hook is not None:
+            self.hook.record("resample", {
+                "seconds": time.perf_counter() - start,
+                "resampled": True,
+                "unique": int(np.count_nonzero(np.diff(indices)) + 1) if len(indices) else 0
+            })
+        return True
 
     def transition(self, delta: float = 1, deterministic: bool = False):
         """
@@ -70,16 +176,92 @@ class ParticleSet(Generic[S, O]):
           deterministic: wether or not to do a deterministic particle transition
            (use in case of missing observation for time step)
         """
-        if not deterministic:
-          self.particles = self.process.transition(self.particles, delta, self.seed)
+        start = time.perf_counter() if self.hook is not None else 0.0
+        process = self.deterministic_process if deterministic else self.process
+        rng = self.streams.generator("transition")
+        if self._pool is not None:
+          def transition_chunk(i: int):
+            chunk = self.particles[self._chunks[i]]
+            process.transition_array(chunk, delta, self._chunk_streams[i].generator("transition"), out=chunk)
+          for _ in self._pool.map(transition_chunk, range(len(self._chunks))):
+            pass
+        elif self.array_backed:
+          process.transition_array(self.particles, delta, rng, out=self.particles)
         else:
-          self.particles = self.deterministic_process.transition(self.particles, delta, self.seed)
-        self.seed += self.N
+          self.particles = process.transition(self.particles, delta, rng)
+
+        if self.hook is not None:
+            self.hook.record("transition", {"seconds": time.perf_counter() - start, "deterministic": deterministic})
 
     def observe(self, observation: O):
         """
         Fourth step of condensation algorithm.
+
+        The new weights are the old weights times the observation
+        likelihoods (the old weights are uniform if we just resampled).
         """
-        self.weights = self.observation_model.observe(self.particles, observation, self.seed)
-        self.seed += self.N * 2
+        start = time.perf_counter() if self.hook is not None else 0.0
+        rng = self.streams.generator("observe")
+        if self.array_backed:
+            if self._pool is not None:
+                likelihoods = self.observation_model.observe_chunks(
+                    self.particles, observation, self._chunks,
+                    [s.generator("observe") for s in self._chunk_streams], self._pool.map
+                )
+            else:
+                likelihoods = self.observation_model.observe_array(self.particles, observation, rng)
+            weights = self.weights
+            weights *= likelihoods
+        else:
+            likelihoods = np.asarray(self.observation_model.observe(self.particles, observation, rng))
+            weights = np.asarray(self.weights) * likelihoods
+
+        total = weights.sum()
+        if not total > 0: # no overlap between prior and likelihood, start over from the likelihood
+            weights[:] = likelihoods
+            total = weights.sum()
+        weights /= total
+
+        if not self.array_backed:
+            self.weights = list(weights)
+
+        if self.hook is not None:
+            self.hook.record("observe", {
+                "seconds": time.perf_counter() - start,
+                "ess": float(self.effective_sample_size()),
+                "entropy": self.weight_entropy()
+            })
+
+    def transition_observe(self, delta: float, observation: O):
+        """
+        Third and fourth step of condensation algorithm together.
+
+        With the fused backend, the velocity noise is drawn from the same stream
+        as in transition, then the physics and the likelihood evaluation run as
+        one compiled loop. Otherwise this is transition followed by observe.
+        """
+        if not self._fused or len(observation) == 0:
+            self.transition(delta)
+            self.observe(observation)
+            return
+
+        start = time.perf_counter() if self.hook is not None else 0.0
+        rng = self.streams.generator("transition")
+        noise = rng.multivariate_normal(np.zeros(2), np.diag(self.process.vel_variance), size = self.N)
+        internal = self.process.internal_process
+        total = fused_transition_observe(
+            self.particles, self.weights, self._likelihoods, noise, delta,
+            internal.world_information, internal.tol, self.observation_model.whitening, observation
+        )
+
+        if not total > 0: # no overlap between prior and likelihood, start over from the likelihood
+            self.weights[:] = self._likelihoods
+            total = self.weights.sum()
+        self.weights /= total
 
+        if self.hook is not None:
+            self.hook.record("transition_observe", {
+                "seconds": time.perf_counter() - start,
+                "ess": float(self.effective_sample_size()),
+                "entropy": self.weight_entropy()
+            })
@@ -0,0 +1,38 @@
+"""
+The Resampler decides which particles survive the resampling
+step of the condensation algorithm (and how often).
+"""
+import numpy as np
+from World.RandomStreams import Seed
+
+class BaseResampler:
+
+    def __init__(self):
+        pass
+
+    def indices(self, weights: np.ndarray, N: int, seed: Seed) -> np.ndarray:
+        """
+        Draw N ancestor indices according to the particle weights.
+
+        The BaseResampler keeps every particle exactly once,
+        it is only used as a base class.
+
+        Parameters:
+          weights: normalized particle weights
+          N: number of particles to draw
+          seed: seed to use for RNG (or the Generator to draw from)
+
+        Returns:
+          sorted (N,) array of indices into the particle set
+        """
+        return np.arange(N)
+
+    @staticmethod
+    def _search(weights: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """
+        Indices of the particles whose cumulative weight interval
+        contains each of the (sorted) positions in [0, 1).
+        """
+        cumulative = np.cumsum(weights)
+        cumulative[-1] = 1.0 # guard against round-off
+        return np.minimum(np.searchsorted(cumulative, positions, side="right"), len(weights) - 1)
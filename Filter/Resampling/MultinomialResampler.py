@@ -0,0 +1,18 @@
+import numpy as np
+from .BaseResampler import BaseResampler
+from World.RandomStreams import Seed
+
+class MultinomialResampler(BaseResampler):
+
+    def __init__(self):
+        """
+        Draw N independent ancestors from the weight distribution.
+
+        The classic (and highest variance) scheme.
+        """
+        pass
+
+    def indices(self, weights: np.ndarray, N: int, seed: Seed) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        counts = rng.multinomial(N, weights)
+        return np.repeat(np.arange(len(weights)), counts)
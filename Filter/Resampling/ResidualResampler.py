@@ -0,0 +1,24 @@
+import numpy as np
+from .BaseResampler import BaseResampler
+from World.RandomStreams import Seed
+
+class ResidualResampler(BaseResampler):
+
+    def __init__(self):
+        """
+        Every particle is first copied floor(N * w) times, the
+        remaining slots are drawn multinomially from the residual weights.
+        """
+        pass
+
+    def indices(self, weights: np.ndarray, N: int, seed: Seed) -> np.ndarray:
+        scaled = N * np.asarray(weights)
+        counts = np.floor(scaled).astype(np.int64)
+        remaining = N - counts.sum()
+
+        if remaining > 0:
+            residual = scaled - counts
+            rng = np.random.default_rng(seed)
+            counts += rng.multinomial(remaining, residual / residual.sum())
+
+        return np.repeat(np.arange(len(weights)), counts)
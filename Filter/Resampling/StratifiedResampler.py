@@ -0,0 +1,17 @@
+import numpy as np
+from .BaseResampler import BaseResampler
+from World.RandomStreams import Seed
+
+class StratifiedResampler(BaseResampler):
+
+    def __init__(self):
+        """
+        Split [0, 1) into N equal strata and draw one
+        uniform position inside each of them.
+        """
+        pass
+
+    def indices(self, weights: np.ndarray, N: int, seed: Seed) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        positions = (rng.random(N) + np.arange(N)) / N
+        return self._search(weights, positions)
@@ -0,0 +1,20 @@
+import numpy as np
+from .BaseResampler import BaseResampler
+from World.RandomStreams import Seed
+
+class SystematicResampler(BaseResampler):
+
+    def __init__(self):
+        """
+        One uniform offset, then N evenly spaced positions
+        along the cumulative weights.
+
+        Lowest variance and cheapest to draw, but the positions
+        are not independent.
+        """
+        pass
+
+    def indices(self, weights: np.ndarray, N: int, seed: Seed) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        positions = (rng.random() + np.arange(N)) / N
+        return self._search(weights, positions)
@@ -0,0 +1,13 @@
+from .BaseResampler import BaseResampler
+from .MultinomialResampler import MultinomialResampler
+from .SystematicResampler import SystematicResampler
+from .StratifiedResampler import StratifiedResampler
+from .ResidualResampler import ResidualResampler
+
+__all__: list[str] = [
+    "BaseResampler",
+    "MultinomialResampler",
+    "SystematicResampler",
+    "StratifiedResampler",
+    "ResidualResampler"
+]
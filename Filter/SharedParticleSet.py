@@ -0,0 +1,294 @@
+"""
+Particle Filter with the particles in shared memory and the
+per-particle work split across worker processes.
+"""
+import time
+import weakref
+import numpy as np
+import multiprocessing as mp
+
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Optional, Union
+
+from World.Initializer import BaseInitializer
+from World.Process import IdentityProcess
+from World.RandomStreams import RandomStreams
+from Instrumentation import BaseHook
+from .Observation import BaseObservationModel
+from .Resampling import BaseResampler, MultinomialResampler
+
+def _view(block: SharedMemory, shape: tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _worker(connection: Connection, names: list[str], N: int, dtype: np.dtype, start: int, end: int, process: IdentityProcess, deterministic_process: IdentityProcess, observation_model: BaseObservationModel, streams: RandomStreams):
+    """
+    Worker loop: owns the particles start to end of the shared arrays and
+    runs the commands of the SharedParticleSet on them. Only commands,
+    observations and (M,) reductions go through the connection.
+    """
+    blocks = [SharedMemory(name=name) for name in names]
+    particles = [_view(blocks[0], (N, 4), dtype), _view(blocks[1], (N, 4), dtype)]
+    weights = _view(blocks[2], (N,), dtype)
+    likelihoods = _view(blocks[3], (N,), dtype)
+    indices = _view(blocks[4], (N,), np.int64)
+    part = slice(start, end)
+    partial: Any = None
+
+    try:
+        while True:
+            command, *args = connection.recv()
+            if command == "stop":
+                break
+            elif command == "transition":
+                delta, deterministic, current = args
+                chunk = particles[current][part]
+                p = deterministic_process if deterministic else process
+                p.transition_array(chunk, delta, streams.generator("transition"), out=chunk)
+                connection.send(None)
+            elif command == "evaluate":
+                observation, current = args
+                partial = observation_model.partial_likelihoods(particles[current][part], observation)
+                connection.send((partial[1], partial[2]))
+            elif command == "weight":
+                scale, = args
+                likelihoods[part] = scale @ partial[0]
+                partial = None
+                weights[part] *= likelihoods[part]
+                connection.send(float(weights[part].sum()))
+            elif command == "gather":
+                current, = args
+                np.take(particles[current], indices[part], axis=0, out=particles[1 - current][part])
+                connection.send(None)
+    finally:
+        del particles, weights, likelihoods, indices
+        for block in blocks:
+            block.close()
+
+def _shutdown(connections: list[Connection], workers: list[Any], blocks: list[SharedMemory]):
+    for connection in connections:
+        try:
+            connection.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+    for worker in workers:
+        worker.join()
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError: # views of the block are still alive, the mapping goes with them
+            pass
+        block.unlink()
+
+class SharedParticleSet:
+    weights: np.ndarray
+    process: IdentityProcess
+    deterministic_process: IdentityProcess
+    observation_model: BaseObservationModel
+    resampler: BaseResampler
+    ess_threshold: Optional[float]
+    hook: Optional[BaseHook]
+    streams: RandomStreams
+    N: int
+    processes: int
+
+    def __init__(self, N: int, initializer: BaseInitializer, process: IdentityProcess, deterministic_process: IdentityProcess, observation_model: BaseObservationModel, seed: Union[int, RandomStreams] = 0, resampler: Optional[BaseResampler] = None, ess_threshold: Optional[float] = None, hook: Optional[BaseHook] = None, dtype: np.dtype = np.float64, processes: int = 2):
+        """
+        Array backed Particle Filter whose particles, weights and likelihoods
+        live in multiprocessing.shared_memory blocks.
+
+        Every worker process owns a fixed partition of the particles. It
+        transitions its partition and, with a separable observation model,
+        evaluates and applies the likelihoods of its partition (the global
+        normalization of each observation is reduced from the workers' (M,)
+        partial results, in partition order). Resampling draws the ancestor
+        indices from the global weights, writes them into shared memory and
+        every worker gathers its partition into the second particle buffer.
+        No particle array is ever pickled.
+
+        Offers the same interface as an array backed ParticleSet. Observation
+        models that are not separable are evaluated in this process (on the
+        shared particles).
+
+        Parameters:
+          N: the number of particles
+          initializer: how to initialize the particles
+          process: state transition model (non-determinism inside)
+          deterministic_process: state transition model to use in
+           case of missing observations
+          observation_model: particle weighting mechanism
+          seed: seed used for RNG (or the streams to draw from), every
+           partition draws from its own spawned streams
+          resampler: resampling scheme (multinomial if not given)
+          ess_threshold: see ParticleSet
+          hook: optional receiver of per-stage measurements (see ParticleSet)
+          dtype: see ParticleSet
+          processes: number of worker processes
+        """
+        if not isinstance(processes, (int, np.integer)) or isinstance(processes, bool) or not 1 <= processes <= N:
+            raise RuntimeError(f"need between 1 and N={N} worker processes, got {processes}")
+        self.N = N
+        self.processes = processes
+        self.process = process
+        self.deterministic_process = deterministic_process
+        self.observation_model = observation_model
+        self.streams = seed if isinstance(seed, RandomStreams) else RandomStreams(seed)
+        self.resampler = resampler if resampler is not None else MultinomialResampler()
+        self.ess_threshold = ess_threshold
+        self.hook = hook
+        self.dtype = np.dtype(dtype)
+
+        # registered before anything is allocated: whatever was created is
+        # released again if the rest of the setup fails
+        self._blocks: list[SharedMemory] = []
+        self._connections: list[Connection] = []
+        self._workers: list[Any] = []
+        self._finalizer = weakref.finalize(self, _shutdown, self._connections, self._workers, self._blocks)
+        try:
+            self._setup(N, initializer, process, deterministic_process, observation_model, processes)
+        except BaseException:
+            self._finalizer()
+            raise
+
+    def _setup(self, N: int, initializer: BaseInitializer, process: IdentityProcess, deterministic_process: IdentityProcess, observation_model: BaseObservationModel, processes: int):
+        """
+        Allocate the shared arrays, draw the initial particles and start the workers.
+        """
+        state_bytes = N * 4 * self.dtype.itemsize
+        sizes = [state_bytes, state_bytes, N * self.dtype.itemsize, N * self.dtype.itemsize, N * 8]
+        for size in sizes:
+            self._blocks.append(SharedMemory(create=True, size=max(size, 1)))
+        self._particles = [_view(self._blocks[0], (N, 4), self.dtype), _view(self._blocks[1], (N, 4), self.dtype)]
+        self._current = 0
+        self.weights = _view(self._blocks[2], (N,), self.dtype)
+        self._likelihoods = _view(self._blocks[3], (N,), self.dtype)
+        self._indices = _view(self._blocks[4], (N,), np.int64)
+
+        self._particles[0][...] = initializer.generate_batch(N, self.streams.generator("initialize"))
+        self.weights.fill(1/N)
+
+        bounds = np.linspace(0, N, processes + 1).astype(int)
+        partition_streams = self.streams.child("partitions").spawn(processes)
+        context = mp.get_context()
+        for i in range(processes):
+            ours, theirs = context.Pipe()
+            worker = context.Process(
+                target = _worker,
+                args = (theirs, [b.name for b in self._blocks], N, self.dtype, int(bounds[i]), int(bounds[i + 1]), process, deterministic_process, observation_model, partition_streams[i]),
+                daemon = True
+            )
+            worker.start()
+            theirs.close()
+            self._connections.append(ours)
+            self._workers.append(worker)
+
+    @property
+    def particles(self) -> np.ndarray:
+        """
+        (N, 4) view of the current particle buffer.
+        """
+        return self._particles[self._current]
+
+    def _broadcast(self, *command) -> list[Any]:
+        for connection in self._connections:
+            connection.send(command)
+        return [connection.recv() for connection in self._connections]
+
+    def close(self):
+        """
+        Stop the workers and release the shared memory.
+        """
+        self._finalizer()
+
+    def effective_sample_size(self) -> float:
+        """
+        Effective sample size 1 / sum(w^2) of the current weights.
+        """
+        return 1 / np.dot(self.weights, self.weights)
+
+    def weight_entropy(self) -> float:
+        """
+        Shannon entropy of the current weights (log(N) for uniform weights).
+        """
+        w = self.weights[self.weights > 0]
+        return float(-np.dot(w, np.log(w)))
+
+    def resample(self) -> bool:
+        """
+        Second step of condensation algorithm (global index draw,
+        partitioned gather).
+
+        Returns:
+          wether the particles were actually resampled
+        """
+        start = time.perf_counter() if self.hook is not None else 0.0
+
+        if self.ess_threshold is not None and self.effective_sample_size() >= self.ess_threshold * self.N:
+            if self.hook is not None:
+                self.hook.record("resample", {"seconds": time.perf_counter() - start, "resampled": False})
+            return False
+
+        weights = np.asarray(self.weights, dtype=float)
+        if weights is not self.weights:
+            weights /= weights.sum() # float32 weights only sum to 1 up to float32 rounding
+        self._indices[...] = self.resampler.indices(weights, self.N, self.streams.generator("resample"))
+
+        self._broadcast("gather", self._current)
+        self._current = 1 - self._current
+        self.weights.fill(1/self.N)
+
+        if self.hook is not None:
+            self.hook.record("resample", {
+                "seconds": time.perf_counter() - start,
+                "resampled": True,
+                "unique": int(np.count_nonzero(np.diff(self._indices)) + 1)
+            })
+        return True
+
+    def transition(self, delta: float = 1, deterministic: bool = False):
+        """
+        Third step of condensation algorithm (every worker
+        transitions its partition).
+        """
+        start = time.perf_counter() if self.hook is not None else 0.0
+        self._broadcast("transition", delta, deterministic, self._current)
+        if self.hook is not None:
+            self.hook.record("transition", {"seconds": time.perf_counter() - start, "deterministic": deterministic})
+
+    def observe(self, observation: Any):
+        """
+        Fourth step of condensation algorithm.
+
+        The new weights are the old weights times the observation likelihoods.
+        """
+        start = time.perf_counter() if self.hook is not None else 0.0
+        if self.observation_model.separable and len(observation) > 0:
+            partial = self._broadcast("evaluate", observation, self._current)
+            scales = self.observation_model.chunk_scales([m for (m, _) in partial], [s for (_, s) in partial])
+            for (connection, scale) in zip(self._connections, scales):
+                connection.send(("weight", scale))
+            total = sum(connection.recv() for connection in self._connections)
+            likelihoods = self._likelihoods
+        else:
+            likelihoods = self.observation_model.observe_array(self.particles, observation, self.streams.generator("observe"))
+            self.weights *= likelihoods
+            total = self.weights.sum()
+
+        if not total > 0: # no overlap between prior and likelihood, start over from the likelihood
+            self.weights[:] = likelihoods
+            total = self.weights.sum()
+        self.weights /= total
+
+        if self.hook is not None:
+            self.hook.record("observe", {
+                "seconds": time.perf_counter() - start,
+                "ess": float(self.effective_sample_size()),
+                "entropy": self.weight_entropy()
+            })
+
+    def transition_observe(self, delta: float, observation: Any):
+        """
+        transition followed by observe (see ParticleSet.transition_observe).
+        """
+        self.transition(delta)
+        self.observe(observation)
@@ -0,0 +1,25 @@
+"""
+estimate Ball Positions and Velocities from
+a TrackedParticleSet.
+"""
+import numpy as np
+
+from .BallEstimator import BallEstimator
+from .TrackedParticleSet import TrackedParticleSet
+
+class TrackEstimator(BallEstimator):
+
+    def __init__(self):
+        """
+        Every track is one ball, its estimate is the weighted mean
+        of its particles (no clustering).
+        """
+        pass
+
+    def estimate(self, N: int, particle_set: TrackedParticleSet) -> list[np.ndarray]:
+        """
+        Estimate the ball states (N has to be the number of tracks).
+        """
+        if N != particle_set.K:
+            raise RuntimeError(f"tracked particle set follows {particle_set.K} balls, {N} requested")
+        return list(particle_set.estimate())
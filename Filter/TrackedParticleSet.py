@@ -0,0 +1,189 @@
+"""
+Multi-target particle filter with one particle set per tracked ball.
+"""
+import time
+import numpy as np
+from typing import Any, Optional, Union
+
+from World.Initializer import BaseInitializer
+from World.Process import StochasticBallArenaProcess
+from World.RandomStreams import RandomStreams
+from Instrumentation import BaseHook
+from .Observation import MultiBallObservationModel
+from .Resampling import BaseResampler
+from .BatchedParticleSet import BatchedParticleSet
+from .Assignment import linear_sum_assignment
+
+class TrackedParticleSet:
+    tracks: BatchedParticleSet
+    observation_model: MultiBallObservationModel
+    gate: float
+    hook: Optional[BaseHook]
+    assignment: np.ndarray
+    K: int
+    N: int
+
+    def __init__(self, K: int, N: int, initializer: BaseInitializer, process: StochasticBallArenaProcess, observation_model: MultiBallObservationModel, seed: Union[int, RandomStreams] = 0, resampler: Optional[BaseResampler] = None, ess_threshold: Optional[float] = None, hook: Optional[BaseHook] = None, gate: float = 5.0, dtype: np.dtype = np.float64):
+        """
+        Factorized multi-ball filter: each of the K tracked balls gets its own
+        particle set of N particles (stored together as one (K, N, 4)
+        BatchedParticleSet, so every step runs for all tracks at once).
+
+        Each step, the observations are associated to the tracks (gated optimal
+        assignment), then every track is weighted by its own observation only.
+        Cost and memory grow linearly with the number of balls, and the balls
+        can be read directly off the tracks (no clustering needed).
+
+        Offers the same resample / transition / observe interface as a
+        ParticleSet, so it can be used as a drop-in filter.
+
+        Parameters:
+          K: number of tracked balls
+          N: particles per track
+          initializer: initializer of the particles
+          process: stochastic transition model
+          observation_model: gives the assumed observation covariance
+          seed: seed used for RNG (or the streams to draw from),
+            every track gets its own spawned streams
+          resampler: resampling scheme (multinomial if not given)
+          ess_threshold: see ParticleSet (checked per track, against N)
+          hook: optional receiver of per-stage measurements (see ParticleSet,
+            ess and entropy are those of the weights over all tracks)
+          gate: observations further than this many standard deviations
+            from a track (mahalanobis distance) are not associated to it
+          dtype: see ParticleSet
+        """
+        self.K = K
+        self.N = N
+        self.observation_model = observation_model
+        self.gate = gate
+        self.hook = hook
+        streams = seed if isinstance(seed, RandomStreams) else RandomStreams(seed)
+        self.tracks = BatchedParticleSet(N, initializer, process, observation_model, streams.spawn(K), resampler, ess_threshold, dtype = dtype)
+        self.assignment = np.full(K, -1, dtype=np.int64)
+
+    def close(self):
+        """
+        Nothing to release (same interface as ParticleSet).
+        """
+        pass
+
+    @property
+    def particles(self) -> np.ndarray:
+        """
+        All particles as one (K * N, 4) array (a view, track by track).
+        """
+        return self.tracks.particles.reshape(-1, 4)
+
+    @property
+    def weights(self) -> np.ndarray:
+        """
+        Weights of all particles, normalized over all tracks.
+        """
+        return self.tracks.weights.reshape(-1) / self.K
+
+    def effective_sample_size(self) -> float:
+        """
+        Effective sample size of the weights over all tracks.
+        """
+        w = self.weights
+        return 1 / np.dot(w, w)
+
+    def weight_entropy(self) -> float:
+        """
+        Shannon entropy of the weights over all tracks.
+        """
+        w = self.weights
+        w = w[w > 0]
+        return float(-np.dot(w, np.log(w)))
+
+    def estimate(self) -> np.ndarray:
+        """
+        (K, 4) weighted mean state of every track.
+        """
+        return np.einsum("kn,knd->kd", self.tracks.weights, self.tracks.particles)
+
+    def associate(self, observation: list[np.ndarray]) -> np.ndarray:
+        """
+        Assign observations to tracks.
+
+        The cost is the squared mahalanobis distance between a track's mean
+        position and the observation, under the track's position spread plus
+        the observation covariance.
+
+        Returns:
+          (K,) index of the observation assigned to each track (-1: none)
+        """
+        o = np.asarray(observation, dtype=float).reshape(-1, 2)
+        assignment = np.full(self.K, -1, dtype=np.int64)
+        if len(o) == 0:
+            return assignment
+
+        w = self.tracks.weights
+        positions = self.tracks.particles[:, :, :2]
+        means = np.einsum("kn,knd->kd", w, positions)
+        centered = positions - means[:, None, :]
+        spread = np.einsum("kn,kni,knj->kij", w, centered, centered) + self.observation_model.variances
+
+        d = o[None, :, :] - means[:, None, :] # (K, M, 2)
+        cost = np.einsum("kmi,kij,kmj->km", d, np.linalg.inv(spread), d)
+
+        gated = cost > self.gate ** 2
+        rows, columns = linear_sum_assignment(np.where(gated, self.gate ** 2 * 1e3, cost))
+        keep = ~gated[rows, columns]
+        assignment[rows[keep]] = columns[keep]
+        return assignment
+
+    def resample(self) -> bool:
+        """
+        Resample every track (see ess_threshold).
+
+        Returns:
+          wether any track was actually resampled
+        """
+        start = time.perf_counter() if self.hook is not None else 0.0
+        resampled = self.tracks.resample()
+        if self.hook is not None:
+            self.hook.record("resample", {
+                "seconds": time.perf_counter() - start,
+                "resampled": bool(resampled.any()),
+                "tracks_resampled": int(resampled.sum())
+            })
+        return bool(resampled.any())
+
+    def transition(self, delta: float = 1, deterministic: bool = False):
+        """
+        Transition every track.
+        """
+        start = time.perf_counter() if self.hook is not None else 0.0
+        self.tracks.transition(delta, deterministic)
+        if self.hook is not None:
+            self.hook.record("transition", {"seconds": time.perf_counter() - start, "deterministic": deterministic})
+
+    def observe(self, observation: list[np.ndarray]):
+        """
+        Associate the observations to the tracks, then weight each
+        track by its own observation (tracks without one keep their weights).
+        """
+        start = time.perf_counter() if self.hook is not None else 0.0
+        self.assignment = self.associate(observation)
+        active = self.assignment >= 0
+        o = np.zeros((self.K, 1, 2))
+        if active.any():
+            o[active, 0] = np.asarray(observation, dtype=float).reshape(-1, 2)[self.assignment[active]]
+        self.tracks.observe(o, active)
+
+        if self.hook is not None:
+            self.hook.record("observe", {
+                "seconds": time.perf_counter() - start,
+                "ess": float(self.effective_sample_size()),
+                "entropy": self.weight_entropy(),
+                "associated": int(active.sum())
+            })
+
+    def transition_observe(self, delta: float, observation: Any):
+        """
+        transition followed by observe (see ParticleSet.transition_observe).
+        """
+        self.transition(delta)
+        self.observe(observation)
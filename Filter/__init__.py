@@ -1,7 +1,21 @@
 from .ParticleSet import ParticleSet
 from .BallEstimator import BallEstimator
+from .LloydBallEstimator import LloydBallEstimator
+from .GridBallEstimator import GridBallEstimator
+from .BatchedParticleSet import BatchedParticleSet
+from .BatchedBallEstimator import BatchedBallEstimator
+from .TrackedParticleSet import TrackedParticleSet
+from .TrackEstimator import TrackEstimator
+from .SharedParticleSet import SharedParticleSet
 
 __all__: list[str] = [
     "ParticleSet",
-    "BallEstimator"
+    "BallEstimator",
+    "LloydBallEstimator",
+    "GridBallEstimator",
+    "BatchedParticleSet",
+    "BatchedBallEstimator",
+    "TrackedParticleSet",
+    "TrackEstimator",
+    "SharedParticleSet"
 ]
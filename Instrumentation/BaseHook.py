@@ -0,0 +1,28 @@
+"""
+Hooks receive per-stage measurements from the ParticleSet
+and the SimulationEngine.
+"""
+from typing import Any
+
+class BaseHook:
+
+    def __init__(self):
+        pass
+
+    def record(self, event: str, values: dict[str, Any]):
+        """
+        Receive one measurement.
+
+        The BaseHook ignores everything, it is only used as a base class.
+
+        Parameters:
+          event: what was measured (resample, transition, observe, estimate, step)
+          values: the measured values (wall times are in seconds)
+        """
+        pass
+
+    def close(self):
+        """
+        Flush and release anything the hook holds on to.
+        """
+        pass
@@ -0,0 +1,26 @@
+import json
+import time
+from typing import Any, TextIO, Union
+
+from .BaseHook import BaseHook
+
+class JsonLinesHook(BaseHook):
+    stream: TextIO
+
+    def __init__(self, target: Union[str, TextIO]):
+        """
+        Write every measurement as one json object per line.
+
+        Parameters:
+          target: file path (opened for appending) or an open text stream
+        """
+        self._owned = isinstance(target, str)
+        self.stream = open(target, "a") if isinstance(target, str) else target
+
+    def record(self, event: str, values: dict[str, Any]):
+        self.stream.write(json.dumps({"event": event, "time": time.time(), **values}) + "\n")
+
+    def close(self):
+        self.stream.flush()
+        if self._owned:
+            self.stream.close()
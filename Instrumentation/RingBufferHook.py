@@ -0,0 +1,26 @@
+import time
+from collections import deque
+from typing import Any
+
+from .BaseHook import BaseHook
+
+class RingBufferHook(BaseHook):
+    buffer: deque
+
+    def __init__(self, capacity: int = 10000):
+        """
+        Keep the last capacity measurements in memory.
+
+        Parameters:
+          capacity: number of measurements to keep
+        """
+        self.buffer = deque(maxlen = capacity)
+
+    def record(self, event: str, values: dict[str, Any]):
+        self.buffer.append({"event": event, "time": time.time(), **values})
+
+    def records(self, event: str = "") -> list[dict[str, Any]]:
+        """
+        Buffered measurements (oldest first), optionally only of one event.
+        """
+        return [r for r in self.buffer if not event or r["event"] == event]
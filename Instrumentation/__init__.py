@@ -0,0 +1,9 @@
+from .BaseHook import BaseHook
+from .JsonLinesHook import JsonLinesHook
+from .RingBufferHook import RingBufferHook
+
+__all__: list[str] = [
+    "BaseHook",
+    "JsonLinesHook",
+    "RingBufferHook"
+]
@@ -0,0 +1,44 @@
+"""
+Optimal sub-pattern assignment (OSPA) distance between two point sets.
+"""
+import numpy as np
+
+from typing import Optional
+
+from Filter.Assignment import linear_sum_assignment
+
+def ospa_distance(truth: np.ndarray, estimates: np.ndarray, cutoff: float = 10.0, order: float = 2.0, assignment: Optional[tuple[np.ndarray, np.ndarray]] = None) -> float:
+    """
+    OSPA distance between the actual and the estimated ball positions.
+
+    Distances are capped at cutoff, every missing or extra estimate costs
+    cutoff, and the result is averaged over the larger set, so it is
+    between 0 (perfect) and cutoff.
+
+    Parameters:
+      truth: (M, 2) actual positions
+      estimates: (E, 2) estimated positions
+      cutoff: largest distance that is counted (also the cardinality penalty)
+      order: order of the distance (2: root mean square)
+      assignment: (rows, columns) matching of truth to estimates to use
+        instead of solving the OSPA assignment (e.g. the minimum squared
+        distance matching, which is the OSPA one for order 2 as long as
+        no matched distance exceeds the cutoff)
+    """
+    x = np.asarray(truth, dtype=float).reshape(-1, 2)
+    y = np.asarray(estimates, dtype=float).reshape(-1, 2)
+    if len(x) == 0 and len(y) == 0:
+        return 0.0
+    if len(x) == 0 or len(y) == 0:
+        return float(cutoff)
+
+    if assignment is None:
+        d = np.minimum(np.linalg.norm(x[:, None, :] - y[None, :, :], axis=2), cutoff) ** order
+        rows, columns = linear_sum_assignment(d)
+        matched = d[rows, columns]
+    else:
+        rows, columns = assignment
+        matched = np.minimum(np.linalg.norm(x[rows] - y[columns], axis=1), cutoff) ** order
+    n = max(len(x), len(y))
+    total = matched.sum() + cutoff ** order * (n - min(len(x), len(y)))
+    return float((total / n) ** (1 / order))
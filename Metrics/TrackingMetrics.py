@@ -0,0 +1,126 @@
+"""
+Tracking quality of a run, accumulated step by step.
+"""
+import numpy as np
+
+from typing import Optional
+
+from Filter.Assignment import linear_sum_assignment
+from .Ospa import ospa_distance
+
+def _assign(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # minimum total squared position distance, (rows, columns) like linear_sum_assignment
+    if len(x) == 0 or len(y) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    d = x[:, None, :2] - y[None, :, :2]
+    return linear_sum_assignment(np.einsum("mei,mei->me", d, d))
+
+def match_estimates(states: np.ndarray, estimates: np.ndarray) -> np.ndarray:
+    """
+    Optimal assignment of estimates to actual balls (minimum total
+    squared position distance).
+
+    Parameters:
+      states: (M, 4) actual ball states
+      estimates: (E, 4) estimated ball states
+
+    Returns:
+      (M,) index of the estimate matched to each ball (-1: none, if E < M)
+    """
+    x = np.asarray(states, dtype=float).reshape(-1, 4)
+    y = np.asarray(estimates, dtype=float).reshape(-1, 4)
+    matched = np.full(len(x), -1, dtype=np.int64)
+    rows, columns = _assign(x, y)
+    matched[rows] = columns
+    return matched
+
+class TrackingMetrics:
+    cutoff: float
+    order: float
+    steps: int
+    matches: int
+    swaps: int
+
+    def __init__(self, cutoff: float = 10.0, order: float = 2.0):
+        """
+        Running tracking metrics: every update matches the estimates to the
+        actual balls and only adds to a few sums, so the memory does not
+        grow with the number of steps.
+
+        - position / velocity RMSE over all matched (ball, estimate) pairs
+        - mean OSPA distance of the positions (see ospa_distance), evaluated
+          on the same matching as the RMSE, so every update solves one
+          assignment
+        - track swaps: how often the estimate matched to a ball changed
+          from one step to the next. This is only meaningful for estimators
+          that keep their order between steps (lloyd, tracked filter),
+          KMeans labels its clusters anew every step.
+
+        Parameters:
+          cutoff: OSPA cutoff distance
+          order: OSPA order
+        """
+        self.cutoff = cutoff
+        self.order = order
+        self.steps = 0
+        self.matches = 0
+        self.swaps = 0
+        self._position_squared = 0.0
+        self._velocity_squared = 0.0
+        self._ospa = 0.0
+        self._previous: Optional[np.ndarray] = None
+
+    def update(self, states: np.ndarray, estimates: np.ndarray) -> np.ndarray:
+        """
+        Add one step.
+
+        Parameters:
+          states: (M, 4) actual ball states
+          estimates: (E, 4) estimated ball states
+
+        Returns:
+          (M,) index of the estimate matched to each ball (-1: none)
+        """
+        x = np.asarray(states, dtype=float).reshape(-1, 4)
+        y = np.asarray(estimates, dtype=float).reshape(-1, 4)
+
+        rows, columns = _assign(x, y)
+        matched = np.full(len(x), -1, dtype=np.int64)
+        matched[rows] = columns
+        found = matched >= 0
+        error = x[rows] - y[columns]
+        self._position_squared += float(np.einsum("mi,mi->", error[:, :2], error[:, :2]))
+        self._velocity_squared += float(np.einsum("mi,mi->", error[:, 2:], error[:, 2:]))
+        self.matches += int(found.sum())
+
+        self._ospa += ospa_distance(x[:, :2], y[:, :2], self.cutoff, self.order, (rows, columns))
+
+        if self._previous is not None and len(self._previous) == len(matched):
+            self.swaps += int(np.count_nonzero((self._previous != matched) & (self._previous >= 0) & found))
+        self._previous = matched
+
+        self.steps += 1
+        return matched
+
+    @property
+    def position_rmse(self) -> float:
+        return float(np.sqrt(self._position_squared / self.matches)) if self.matches else 0.0
+
+    @property
+    def velocity_rmse(self) -> float:
+        return float(np.sqrt(self._velocity_squared / self.matches)) if self.matches else 0.0
+
+    @property
+    def mean_ospa(self) -> float:
+        return self._ospa / self.steps if self.steps else 0.0
+
+    def summary(self) -> dict[str, float]:
+        """
+        The metrics so far, e.g. as columns of a results table.
+        """
+        return {
+            "position_rmse": self.position_rmse,
+            "velocity_rmse": self.velocity_rmse,
+            "ospa": self.mean_ospa,
+            "track_swaps": self.swaps
+        }
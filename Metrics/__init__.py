@@ -0,0 +1,8 @@
+from .Ospa import ospa_distance
+from .TrackingMetrics import TrackingMetrics, match_estimates
+
+__all__: list[str] = [
+    "ospa_distance",
+    "TrackingMetrics",
+    "match_estimates"
+]
@@ -1,15 +1,17 @@
 import numpy as np
+from World.RandomStreams import Seed
 
 class MultiBallSensor:
     variance: np.ndarray
 
-    def __init__(self, variances: np.ndarray, seed: int = 0):
+    def __init__(self, variances: np.ndarray, seed: Seed = 0):
         """
         This simulates a noisy sensor by adding normally
         distributed values to true observations.
 
         Parameters:
           variances of ball positions picked up by this sensor
+          seed: seed of the sensor noise (or the Generator to draw it from)
         """
         if variances.shape != (2,2):
             raise RuntimeError(f"positional variance must be shape (2,2) got {variances.shape}")
@@ -29,3 +31,19 @@ class MultiBallSensor:
         positions = np.array(states)[:,:2]
         
         return list(positions + self.rng.multivariate_normal(np.zeros(2), self.variance, size = len(states)))
+
+    def sense_batch(self, states: np.ndarray) -> np.ndarray:
+        """
+        Sense a whole trajectory at once.
+
+        The noise for all steps is drawn in one call, in the same order
+        as T consecutive calls to sense would draw it.
+
+        Parameters:
+          states: (T, M, 4) ball states
+
+        Return:
+          (T, M, 2) sensed POSITIONS
+        """
+        states = np.asarray(states)
+        return states[..., :2] + self.rng.multivariate_normal(np.zeros(2), self.variance, size = states.shape[:2])
@@ -0,0 +1,115 @@
+"""
+On-disk recording of sensor readings that can be replayed
+into a particle filter.
+"""
+import os
+import numpy as np
+
+from typing import Iterator, NamedTuple, Optional
+
+from Storage import NpyStream
+
+class TapeChunk(NamedTuple):
+    timestamps: np.ndarray # (T,) seconds
+    observations: np.ndarray # (T, M, 2) sensed positions
+    observation_missing: np.ndarray # (T,) dropout flags
+    truth: Optional[np.ndarray] # (T, M, 4) actual states, if known
+
+class SensorTapeWriter:
+    directory: str
+
+    def __init__(self, directory: str, number_of_balls: int, with_truth: bool = False, capacity: Optional[int] = None, dtype = np.float64):
+        """
+        Write a sensor tape: a directory of .npy files
+        (timestamps, observations, observation_missing and optionally truth).
+
+        Parameters:
+          directory: where to put the tape (created if missing)
+          number_of_balls: observations per reading
+          with_truth: also store the actual ball states
+          capacity: number of readings to preallocate for (None: grow in chunks)
+          dtype: storage type of observations and truth (float32 halves the size)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+        def stream(name, row_shape, stream_dtype):
+            return NpyStream(os.path.join(directory, name + ".npy"), row_shape, stream_dtype, capacity)
+
+        self.timestamps = stream("timestamps", (), np.float64)
+        self.observations = stream("observations", (number_of_balls, 2), dtype)
+        self.observation_missing = stream("observation_missing", (), np.bool_)
+        self.truth = stream("truth", (number_of_balls, 4), dtype) if with_truth else None
+
+    def write(self, timestamp: float, observations: list[np.ndarray], observation_missing: bool = False, truth: Optional[np.ndarray] = None):
+        """
+        Append one sensor reading.
+        """
+        self.timestamps.append(timestamp)
+        self.observations.append(np.asarray(observations))
+        self.observation_missing.append(observation_missing)
+        if self.truth is not None:
+            self.truth.append(truth)
+
+    def write_batch(self, timestamps: np.ndarray, observations: np.ndarray, observation_missing: Optional[np.ndarray] = None, truth: Optional[np.ndarray] = None):
+        """
+        Append T sensor readings at once.
+
+        Parameters:
+          timestamps: (T,)
+          observations: (T, M, 2)
+          observation_missing: (T,) (default: nothing missing)
+          truth: (T, M, 4) (only stored if the tape has truth)
+        """
+        self.timestamps.extend(timestamps)
+        self.observations.extend(observations)
+        self.observation_missing.extend(np.zeros(len(timestamps), dtype=bool) if observation_missing is None else observation_missing)
+        if self.truth is not None:
+            self.truth.extend(truth)
+
+    def close(self):
+        self.timestamps.close()
+        self.observations.close()
+        self.observation_missing.close()
+        if self.truth is not None:
+            self.truth.close()
+
+class SensorTape:
+    timestamps: np.ndarray
+    observations: np.ndarray
+    observation_missing: np.ndarray
+    truth: Optional[np.ndarray]
+
+    def __init__(self, directory: str):
+        """
+        Open a tape written by SensorTapeWriter.
+
+        The files are memory mapped, so only the chunks that are
+        actually read are loaded.
+        """
+        def load(name):
+            path = os.path.join(directory, name + ".npy")
+            return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+        self.timestamps = load("timestamps")
+        self.observations = load("observations")
+        self.observation_missing = load("observation_missing")
+        self.truth = load("truth")
+        if self.timestamps is None or self.observations is None or self.observation_missing is None:
+            raise RuntimeError(f"{directory} is not a sensor tape")
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def chunks(self, chunk_size: int = 4096) -> Iterator[TapeChunk]:
+        """
+        Stream the tape in chunks of (at most) chunk_size readings.
+        """
+        for start in range(0, len(self), chunk_size):
+            end = start + chunk_size
+            yield TapeChunk(
+                self.timestamps[start:end],
+                np.asarray(self.observations[start:end], dtype=float),
+                np.asarray(self.observation_missing[start:end]),
+                None if self.truth is None else np.asarray(self.truth[start:end], dtype=float)
+            )
@@ -1,5 +1,9 @@
 from .MultiBallSensor import MultiBallSensor
+from .SensorTape import SensorTape, SensorTapeWriter, TapeChunk
 
 __all__: list[str] = [
-    "MultiBallSensor"
+    "MultiBallSensor",
+    "SensorTape",
+    "SensorTapeWriter",
+    "TapeChunk"
 ]
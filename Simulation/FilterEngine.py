@@ -0,0 +1,197 @@
+"""
+The particle filter side of a Ball Estimation run
+(everything that only depends on our assumptions about the world).
+"""
+import time
+import numpy as np
+
+from dataclasses import fields
+from typing import Callable, Optional, Union
+
+from World.WorldInformation import BallWorldInformation
+from World.RandomStreams import RandomStreams
+from World.Process import BallArenaProcess, StochasticBallArenaProcess
+from World.Initializer import UniformPositionNormalVelocityInitializer
+from Filter.Observation import MultiBallObservationModel, GatedMultiBallObservationModel
+from Filter import ParticleSet, TrackedParticleSet, SharedParticleSet, BallEstimator, LloydBallEstimator, GridBallEstimator, TrackEstimator
+from Filter.Resampling import BaseResampler, MultinomialResampler, SystematicResampler, StratifiedResampler, ResidualResampler
+from Instrumentation import BaseHook
+from .SimulationParameters import SimulationParameters
+
+RESAMPLERS: dict[str, type[BaseResampler]] = {
+    "multinomial": MultinomialResampler,
+    "systematic": SystematicResampler,
+    "stratified": StratifiedResampler,
+    "residual": ResidualResampler
+}
+
+# estimator name -> factory (given the assumed world)
+ESTIMATORS: dict[str, Callable[[BallWorldInformation], BallEstimator]] = {
+    "kmeans": lambda world: BallEstimator(),
+    "lloyd": lambda world: LloydBallEstimator(),
+    "grid": lambda world: GridBallEstimator(world)
+}
+
+class FilterEngine:
+    p: SimulationParameters
+    assumed_world: BallWorldInformation
+    particle_set: Union[ParticleSet, TrackedParticleSet, SharedParticleSet]
+    estimator: BallEstimator
+    estimated_states: Optional[list[np.ndarray]]
+    hook: Optional[BaseHook]
+
+    def __init__(self, p: SimulationParameters, hook: Optional[BaseHook] = None):
+        """
+        Set up the particle filter and the estimator from the
+        assumed_* parameters (the actual world parameters are not used).
+
+        Parameters:
+          p: parameters of the run
+          hook: optional receiver of estimator (and, through the
+            ParticleSet, per-stage) measurements
+        """
+        self.p = p
+        self.hook = hook
+        self.delta = 1 / p.measurements_per_second
+
+        # our assumptions about the world
+        self.assumed_world = BallWorldInformation(
+            width = p.assumed_width,
+            height = p.assumed_height,
+            gravity = p.assumed_gravity,
+            ball_radius = p.assumed_ball_radius,
+            bounce_discount = p.assumed_bounce_discount,
+            air_discount = p.assumed_air_discount,
+            ground_discount = p.assumed_ground_discount
+        )
+
+        self.assumed_deterministic_process = BallArenaProcess(self.assumed_world)
+
+        assumed_transition_process = StochasticBallArenaProcess(
+            self.assumed_deterministic_process,
+            np.array(p.transition_velocity_variance).astype(float)
+        )
+
+        observation_model: MultiBallObservationModel
+        if p.observation_gate is not None:
+            observation_model = GatedMultiBallObservationModel(
+                np.array(p.assumed_sensor_variance).astype(float),
+                p.observation_gate
+            )
+        else:
+            observation_model = MultiBallObservationModel(
+                np.array(p.assumed_sensor_variance).astype(float)
+            )
+
+        assumed_initialization = UniformPositionNormalVelocityInitializer(
+            np.diag(p.assumed_initial_velocity_variance).astype(float),
+            self.assumed_world
+        )
+
+        if p.filter == "tracked":
+            # these only configure the joint filter, refuse them instead of ignoring them
+            defaults = {f.name: f.default for f in fields(SimulationParameters)}
+            ignored = [name for name in ("estimator", "threads", "backend", "processes") if getattr(p, name) != defaults[name]]
+            if ignored:
+                raise ValueError(f"filter=\"tracked\" does not support {', '.join(ignored)} (only used by the joint filter)")
+
+            # one particle set per assumed ball, read out without clustering
+            self.particle_set = TrackedParticleSet(
+                p.assumed_number_of_balls,
+                p.number_of_particles // p.assumed_number_of_balls,
+                assumed_initialization,
+                assumed_transition_process,
+                observation_model,
+                RandomStreams(p.seed).child("filter"),
+                resampler = RESAMPLERS[p.resampler](),
+                ess_threshold = p.ess_threshold,
+                hook = hook,
+                dtype = np.dtype(p.dtype)
+            )
+            self.estimator = TrackEstimator()
+        else:
+            if p.processes is not None:
+                # particles in shared memory, partitions stepped by worker processes
+                self.particle_set = SharedParticleSet(
+                    p.number_of_particles,
+                    assumed_initialization,
+                    assumed_transition_process,
+                    self.assumed_deterministic_process,
+                    observation_model,
+                    RandomStreams(p.seed).child("filter"),
+                    resampler = RESAMPLERS[p.resampler](),
+                    ess_threshold = p.ess_threshold,
+                    hook = hook,
+                    dtype = np.dtype(p.dtype),
+                    processes = p.processes
+                )
+            else:
+                self.particle_set = ParticleSet(
+                    p.number_of_particles,
+                    assumed_initialization,
+                    assumed_transition_process,
+                    self.assumed_deterministic_process,
+                    observation_model,
+                    RandomStreams(p.seed).child("filter"),
+                    array_backed = True,
+                    resampler = RESAMPLERS[p.resampler](),
+                    ess_threshold = p.ess_threshold,
+                    hook = hook,
+                    dtype = np.dtype(p.dtype),
+                    threads = p.threads,
+                    backend = p.backend
+                )
+
+            self.estimator = ESTIMATORS[p.estimator](self.assumed_world)
+
+        self.estimated_states = None
+
+    def close(self):
+        """
+        Release the particle set's threads, processes or shared memory.
+        """
+        self.particle_set.close()
+
+    def update(self, observations: list[np.ndarray], observation_missing: bool = False, delta: Optional[float] = None) -> list[np.ndarray]:
+        """
+        Estimate the ball states from the current particles, then run
+        the condensation steps with this step's observations.
+
+        Parameters:
+          observations: sensed ball positions
+          observation_missing: ignore the observations (particles and
+            estimates are propagated deterministically)
+          delta: time since the previous observations (default:
+            1 / measurements_per_second)
+
+        Returns:
+          the estimated ball states (before taking in the observations)
+        """
+        if delta is None:
+            delta = self.delta
+
+        if not observation_missing or self.estimated_states is None:
+            start = time.perf_counter() if self.hook is not None else 0.0
+            estimated_states = self.estimator.estimate(
+                self.p.assumed_number_of_balls,
+                self.particle_set
+            )
+            if self.hook is not None:
+                self.hook.record("estimate", {
+                    "seconds": time.perf_counter() - start,
+                    "iterations": self.estimator.last_iterations
+                })
+        else:
+            # if the observation is missing, just propagate old estimates
+            estimated_states = self.assumed_deterministic_process.transition(self.estimated_states, delta)
+        self.estimated_states = estimated_states
+
+        if not observation_missing:
+            # Condensation Algorithm
+            self.particle_set.resample()
+            self.particle_set.transition_observe(delta, observations)
+        else:
+            # propagate the particles deterministically in case of missing observation
+            self.particle_set.transition(delta, deterministic = observation_missing)
+
+        return estimated_states
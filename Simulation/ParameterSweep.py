@@ -0,0 +1,167 @@
+"""
+Run many headless simulations (parameter grids or random samples)
+across a process pool.
+"""
+import csv
+import itertools
+import time
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields, replace
+from typing import Any, Iterator, Optional, Sequence, Union, get_args, get_origin, get_type_hints
+
+from Metrics import TrackingMetrics
+from .SimulationParameters import SimulationParameters
+from .FilterEngine import FilterEngine
+from .Scenario import generate_scenario
+
+def parameter_type(name: str) -> Any:
+    """
+    Annotated type of a SimulationParameters field, with Optional[...]
+    unwrapped (the defaults are no good for this, e.g. float fields
+    default to the int 1 and Optional fields to None).
+
+    Parameters:
+      name: the field name
+    """
+    hints = get_type_hints(SimulationParameters)
+    if name not in hints:
+        raise RuntimeError(f"unknown parameter {name}")
+    hint = hints[name]
+    if get_origin(hint) is Union:
+        hint = next(arg for arg in get_args(hint) if arg is not type(None))
+    return hint
+
+def grid(base: SimulationParameters, axes: dict[str, Sequence[Any]]) -> list[SimulationParameters]:
+    """
+    All combinations of the given parameter values.
+
+    Parameters:
+      base: parameters that are not swept
+      axes: parameter name -> values to try
+    """
+    names = list(axes.keys())
+    return [replace(base, **dict(zip(names, values))) for values in itertools.product(*axes.values())]
+
+def random_sample(base: SimulationParameters, ranges: dict[str, tuple[float, float]], count: int, seed: int = 0) -> list[SimulationParameters]:
+    """
+    count parameter sets with each swept parameter drawn uniformly from its range.
+
+    Integer parameters are drawn as integers (upper bound inclusive), tuple
+    parameters (variances) get the same value in both components. The
+    kind of a parameter is taken from its annotation (see parameter_type).
+
+    Parameters:
+      base: parameters that are not swept
+      ranges: parameter name -> (low, high)
+      count: number of parameter sets
+      seed: seed used for RNG
+    """
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(count):
+        values: dict[str, Any] = {}
+        for (name, (low, high)) in ranges.items():
+            kind = parameter_type(name)
+            if kind is int:
+                values[name] = int(rng.integers(low, high, endpoint=True))
+            elif get_origin(kind) is tuple:
+                v = float(rng.uniform(low, high))
+                values[name] = (v,) * len(get_args(kind))
+            elif kind is float:
+                values[name] = float(rng.uniform(low, high))
+            else:
+                raise RuntimeError(f"cannot draw {name} from a range")
+        samples.append(replace(base, **values))
+    return samples
+
+def tracking_error(states: np.ndarray, estimated_states: list[np.ndarray]) -> float:
+    """
+    Mean distance of each actual ball to the closest estimated ball.
+    """
+    estimates = np.asarray(estimated_states)[:, :2]
+    d = np.linalg.norm(states[:, None, :2] - estimates[None, :, :], axis=2)
+    return float(d.min(axis=1).mean())
+
+def run_one(p: SimulationParameters) -> dict[str, Any]:
+    """
+    Run one simulation headless for p.max_steps steps.
+
+    The truth and the observations are generated up front, so the
+    timed part is the filter only (the error metrics are computed
+    outside of the timed part).
+
+    Returns:
+      row of the results table (parameters and metrics)
+    """
+    p = replace(p, live_show = False, show_summary_plots = False)
+
+    start = time.perf_counter()
+    scenario = generate_scenario(p)
+    engine = FilterEngine(p)
+    setup_time = time.perf_counter() - start
+
+    error = 0.0
+    metrics = TrackingMetrics()
+    run_time = 0.0
+    try:
+        for (states, observations) in zip(scenario.truth, scenario.observations):
+            start = time.perf_counter()
+            estimated_states = engine.update(list(observations))
+            run_time += time.perf_counter() - start
+            error += tracking_error(states, estimated_states)
+            metrics.update(states, np.asarray(estimated_states))
+    finally:
+        engine.close()
+
+    row = asdict(p)
+    row.update(
+        tracking_error = error / max(p.max_steps, 1),
+        runtime_per_step = run_time / max(p.max_steps, 1),
+        setup_time = setup_time,
+        **metrics.summary()
+    )
+    return row
+
+def run_sweep(parameters: list[SimulationParameters], seeds: Sequence[int] = (0,), workers: Optional[int] = None, output: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """
+    Run every parameter set with every seed across a process pool.
+
+    Rows are yielded (and appended to output as csv) in the order
+    the runs finish. Every run draws from the RandomStreams of its own
+    seed, so its result does not depend on the worker it ran on. A run
+    that raises gives a row with its parameters and the exception in the
+    error column (the metric columns stay empty), the sweep goes on.
+
+    Parameters:
+      parameters: parameter sets to run
+      seeds: seeds to run each parameter set with
+      workers: number of worker processes (default: number of cores)
+      output: optional csv file the results table is streamed into
+    """
+    runs = [replace(p, seed = seed) for p in parameters for seed in seeds]
+    columns = [f.name for f in fields(SimulationParameters)] + ["tracking_error", "runtime_per_step", "setup_time"] + list(TrackingMetrics().summary().keys()) + ["error"]
+
+    out_file = open(output, "w", newline="") if output is not None else None
+    try:
+        writer = None
+        if out_file is not None:
+            writer = csv.DictWriter(out_file, fieldnames = columns)
+            writer.writeheader()
+
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            futures = {pool.submit(run_one, p): p for p in runs}
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as e:
+                    row = asdict(replace(futures[future], live_show = False, show_summary_plots = False))
+                    row["error"] = f"{type(e).__name__}: {e}"
+                if writer is not None:
+                    writer.writerow(row)
+                    out_file.flush()
+                yield row
+    finally:
+        if out_file is not None:
+            out_file.close()
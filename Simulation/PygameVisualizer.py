@@ -0,0 +1,223 @@
+"""
+Live PyGame view of a running simulation, drawn on the main thread
+while the filter steps on another one.
+"""
+import queue
+import threading
+import pygame
+import numpy as np
+
+from typing import NamedTuple, Optional
+
+from World.WorldInformation import BallWorldInformation
+from Filter import ParticleSet
+from .SimulationParameters import SimulationParameters
+from .SimulationEngine import StepResult
+
+# pygame window parameters
+DIM = 1000
+MARGIN = 0.1
+INNER = DIM - 2 * DIM * MARGIN
+BORDER = MARGIN * DIM
+
+# pixel offsets of one particle dot (a disc of radius 3)
+_STAMP = np.array([(dx, dy) for dx in range(-3, 4) for dy in range(-3, 4) if dx * dx + dy * dy <= 9])
+
+class Snapshot(NamedTuple):
+    observations: np.ndarray # (M, 2) sensed ball positions
+    states_backlog: np.ndarray # (T, M, 4) recent actual states, oldest first
+    est_states_backlog: np.ndarray # (T, E, 4) recent estimates, oldest first
+    positions: Optional[np.ndarray] # (N, 2) particle positions (None if particles are hidden)
+    weights: Optional[np.ndarray] # (N,) particle weights
+
+class PygameVisualizer:
+    p: SimulationParameters
+    world: BallWorldInformation
+    assumed_world: BallWorldInformation
+    observation_missing: bool
+    running: bool
+    frames_dropped: int
+
+    def __init__(self, p: SimulationParameters, world: BallWorldInformation, assumed_world: BallWorldInformation, fps: int = 60):
+        """
+        Open the window. The visualizer only consumes snapshots of the
+        SimulationEngine's results, it does not step it.
+
+        Must be created on the main thread, which then runs render_loop (SDL
+        wants the window and the event loop on the main thread), while the
+        filter steps on another thread and hands its results over with
+        submit. render_loop draws the newest snapshot at its own frame rate.
+        Snapshots that arrive while the previous one was not drawn yet are
+        dropped (and not even copied), so drawing never slows down the filter.
+
+        Pressing 'd' sets observation_missing for as long as the key is held.
+
+        Parameters:
+          fps: frame rate limit of render_loop
+        """
+        self.p = p
+        self.world = world
+        self.assumed_world = assumed_world
+        self.fps = fps
+        self.observation_missing = False
+        self.running = True
+        self.frames_dropped = 0
+
+        self._snapshots: queue.Queue[Snapshot] = queue.Queue(maxsize = 1)
+        self._stopped = threading.Event()
+
+        pygame.init()
+        pygame.font.init()
+        self.font = pygame.font.SysFont('monospace', 30)
+        self.screen = pygame.display.set_mode((DIM,DIM))
+        self._layer = pygame.Surface((DIM,DIM), depth = 32)
+        self._layer.set_colorkey((0, 0, 0))
+        self.clock = pygame.time.Clock()
+
+    def submit(self, result: StepResult, particle_set: ParticleSet, states_backlog: np.ndarray, est_states_backlog: np.ndarray) -> bool:
+        """
+        Hand one step to render_loop (dropped if it is still busy),
+        called from the filter's thread.
+
+        Parameters:
+          result: the step to draw
+          particle_set: the filter's particles after this step
+          states_backlog: (T, M, 4) recent actual states, oldest first
+          est_states_backlog: (T, E, 4) recent estimates, oldest first
+
+        Returns:
+          False once the window was closed
+        """
+        if self._snapshots.full():
+            self.frames_dropped += 1
+            return self.running
+
+        positions, weights = None, None
+        if self.p.show_particles:
+            positions = np.array(np.asarray(particle_set.particles)[:, :2], dtype=float)
+            weights = np.array(particle_set.weights, dtype=float)
+
+        snapshot = Snapshot(
+            observations = np.array(result.observations, dtype=float).reshape(-1, 2),
+            states_backlog = np.array(states_backlog, dtype=float),
+            est_states_backlog = np.array(est_states_backlog, dtype=float),
+            positions = positions,
+            weights = weights
+        )
+        try:
+            self._snapshots.put_nowait(snapshot)
+        except queue.Full:
+            self.frames_dropped += 1
+        return self.running
+
+    def _to_screen(self, positions: np.ndarray) -> np.ndarray:
+        """
+        (..., 2) world positions to (..., 2) window coordinates.
+        """
+        screen = np.empty(positions.shape)
+        screen[..., 0] = (positions[..., 0] / self.world.width) * INNER + BORDER
+        screen[..., 1] = INNER - (positions[..., 1] / self.world.height) * INNER + BORDER
+        return screen
+
+    def render_loop(self):
+        """
+        Handle events and draw the submitted snapshots until the window is
+        closed or close is called (main thread only, closes pygame at the end).
+        """
+        try:
+            while self.running and not self._stopped.is_set():
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_d:
+                            self.observation_missing = True
+                    elif event.type == pygame.KEYUP:
+                        if event.key == pygame.K_d:
+                            self.observation_missing = False
+
+                try:
+                    snapshot = self._snapshots.get(timeout = 1 / self.fps)
+                except queue.Empty:
+                    continue # nothing new, keep handling events
+                self._draw(snapshot)
+                pygame.display.flip()
+                self.clock.tick(self.fps)
+        finally:
+            self.running = False
+            pygame.quit()
+
+    def _draw(self, snapshot: Snapshot):
+        """
+        Draw one frame (main thread only).
+        """
+        self.screen.fill("black")
+        text_surface = self.font.render("press 'd' to make observations cut out", False, (255, 0, 0))
+        self.screen.blit(text_surface, (10,10))
+        pygame.draw.rect(self.screen, "grey", [BORDER, BORDER, INNER, INNER])
+
+        tail = max(self.p.visualize_tail_length, 1)
+        if self.p.show_actual_positions:
+            rad = (self.world.ball_radius / self.world.width) * INNER
+            for (i, balls) in enumerate(self._to_screen(snapshot.states_backlog[..., :2])):
+                for position in balls:
+                    pygame.draw.circle(self.screen, (0,0,int(255 * i/tail)), position, rad)
+
+        rad = (self.assumed_world.ball_radius / self.world.width) * INNER
+        for (i, balls) in enumerate(self._to_screen(snapshot.est_states_backlog[..., :2])):
+            for position in balls:
+                pygame.draw.circle(self.screen, (0,int(255 * i/tail),0), position, rad)
+
+        if self.p.show_observations:
+            for position in self._to_screen(snapshot.observations):
+                pygame.draw.circle(self.screen, "red", position, 5)
+
+        if snapshot.positions is not None and len(snapshot.positions) > 0:
+            self._rasterize(snapshot.positions, snapshot.weights)
+
+    def _rasterize(self, positions: np.ndarray, weights: np.ndarray):
+        """
+        Write all particle dots straight into the pixels of a 32 bit layer
+        (one packed integer per pixel, one vectorized write per dot pixel
+        into the (x, y) indexed pixel view),
+        then blit the layer onto the screen. Yellow, brighter for larger
+        weights. Black is the layer's transparent color, so the darkest dots
+        are drawn at 1/255 instead.
+        """
+        ma, mi = weights.max(), weights.min()
+        coeff = (weights - mi) / max(ma - mi, 0.0001)
+        level = np.maximum(coeff * 255, 1).astype(np.uint32)
+        red, green, _, _ = self._layer.get_shifts()
+        colors = (level << red) | (level << green)
+
+        width, height = self._layer.get_size()
+        r = int(np.abs(_STAMP).max())
+        centers = np.floor(self._to_screen(positions)).astype(np.int64)
+        x, y = centers[:, 0], centers[:, 1]
+
+        # dots outside the window are dropped (not clipped onto its border), only
+        # the few dots that are cut by the border need a mask per dot pixel
+        visible = (x >= -r) & (x < width + r) & (y >= -r) & (y < height + r)
+        whole = visible & (x >= r) & (x < width - r) & (y >= r) & (y < height - r)
+        cut = visible & ~whole
+        xw, yw, cw = x[whole], y[whole], colors[whole]
+        xc, yc, cc = x[cut], y[cut], colors[cut]
+
+        self._layer.fill((0, 0, 0))
+        pixels = pygame.surfarray.pixels2d(self._layer) # (width, height) view, locks the layer
+        try:
+            for (dx, dy) in _STAMP:
+                pixels[xw + dx, yw + dy] = cw
+                px, py = xc + dx, yc + dy
+                inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[px[inside], py[inside]] = cc[inside]
+        finally:
+            del pixels
+        self.screen.blit(self._layer, (0, 0))
+
+    def close(self):
+        """
+        Make render_loop return (and close the window), e.g. once the
+        filter is done. Can be called from any thread.
+        """
+        self._stopped.set()
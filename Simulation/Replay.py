@@ -0,0 +1,81 @@
+"""
+Record sensor tapes from the simulation and run
+the particle filter against recorded tapes.
+"""
+import numpy as np
+
+from typing import Iterator, Optional
+
+from Sensor import SensorTape, SensorTapeWriter
+from Instrumentation import BaseHook
+from .SimulationParameters import SimulationParameters
+from .SimulationEngine import StepResult
+from .Scenario import generate_scenario
+from .FilterEngine import FilterEngine
+
+def record_tape(p: SimulationParameters, directory: str, n_steps: Optional[int] = None, dropout: Optional[np.ndarray] = None):
+    """
+    Simulate n_steps (default: p.max_steps) steps and write the
+    sensor readings and the ground truth to a tape.
+
+    Parameters:
+      p: parameters of the run (only the actual world and the sensor matter for the tape)
+      directory: where to write the tape
+      n_steps: number of readings
+      dropout: optional (n_steps,) bool, readings to mark as missing
+    """
+    scenario = generate_scenario(p, n_steps)
+    T = len(scenario.truth)
+    writer = SensorTapeWriter(directory, p.number_of_balls, with_truth = True, capacity = T)
+    try:
+        writer.write_batch(
+            np.arange(T) * scenario.delta,
+            scenario.observations,
+            None if dropout is None else np.asarray(dropout, dtype=bool),
+            scenario.truth
+        )
+    finally:
+        writer.close()
+
+class ReplayEngine(FilterEngine):
+
+    def __init__(self, p: SimulationParameters, hook: Optional[BaseHook] = None):
+        """
+        A particle filter (set up from the assumed_* parameters) that
+        takes its observations from a sensor tape instead of a simulated world.
+        """
+        super().__init__(p, hook)
+
+    def run(self, tape: SensorTape, chunk_size: int = 4096) -> Iterator[StepResult]:
+        """
+        Feed every reading of the tape (read in chunks) to the filter.
+
+        The particles are propagated by the time between consecutive
+        timestamps, so irregularly timed tapes are filtered with the
+        actual time steps (the first reading uses 1 / measurements_per_second).
+
+        Yields:
+          one StepResult per reading (states is the recorded ground
+          truth, None if the tape has none)
+        """
+        step = 0
+        previous: Optional[float] = None
+        for chunk in tape.chunks(chunk_size):
+            for i in range(len(chunk.timestamps)):
+                timestamp = float(chunk.timestamps[i])
+                delta = None if previous is None else timestamp - previous
+                if delta is not None and delta < 0:
+                    raise RuntimeError(f"tape timestamps go back in time at reading {step} ({previous} -> {timestamp})")
+                previous = timestamp
+
+                observations = chunk.observations[i]
+                missing = bool(chunk.observation_missing[i])
+                estimated_states = self.update(list(observations), missing, delta)
+                yield StepResult(
+                    step = step,
+                    states = None if chunk.truth is None else chunk.truth[i],
+                    observations = list(observations),
+                    estimated_states = estimated_states,
+                    observation_missing = missing
+                )
+                step += 1
@@ -0,0 +1,80 @@
+"""
+The actual world of a Ball Estimation run, and whole
+scenarios (truth and observations) generated up front.
+"""
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Optional
+
+from World.WorldInformation import BallWorldInformation
+from World.RandomStreams import RandomStreams
+from World.Process import BallArenaProcess
+from World.Initializer import UniformPositionNormalVelocityInitializer
+from Sensor import MultiBallSensor
+from .SimulationParameters import SimulationParameters
+
+@dataclass
+class ActualWorld:
+    world: BallWorldInformation
+    process: BallArenaProcess
+    sensor: MultiBallSensor
+    states: np.ndarray # initial ball states
+
+def build_actual_world(p: SimulationParameters) -> ActualWorld:
+    """
+    Set up the actual world, its process, the sensor and the
+    initial ball states from the (non assumed) parameters.
+
+    The initial states and the sensor noise are drawn from their
+    own streams of p.seed (independent of the filter's streams).
+    """
+    streams = RandomStreams(p.seed).child("world")
+
+    world = BallWorldInformation(
+        width = p.width,
+        height = p.height,
+        gravity = p.gravity,
+        ball_radius = p.ball_radius,
+        bounce_discount = p.bounce_discount,
+        air_discount = p.air_discount,
+        ground_discount = p.ground_discount
+    )
+
+    initializer = UniformPositionNormalVelocityInitializer(
+        np.diag(p.initial_velocity_variance).astype(float),
+        world
+    )
+
+    sensor = MultiBallSensor(
+        np.diag(p.sensor_variance).astype(float),
+        seed = streams.generator("sensor")
+    )
+
+    return ActualWorld(
+        world = world,
+        process = BallArenaProcess(world),
+        sensor = sensor,
+        states = initializer.generate_batch(p.number_of_balls, streams.generator("initialize"))
+    )
+
+@dataclass
+class Scenario:
+    delta: float
+    truth: np.ndarray # (T, M, 4) actual ball states
+    observations: np.ndarray # (T, M, 2) sensed ball positions
+
+def generate_scenario(p: SimulationParameters, n_steps: Optional[int] = None) -> Scenario:
+    """
+    Generate the truth trajectory and the noisy observations of
+    n_steps (default: p.max_steps) steps at once.
+
+    Deterministic from p.seed, and identical to what the
+    SimulationEngine produces step by step.
+    """
+    n_steps = p.max_steps if n_steps is None else n_steps
+    actual = build_actual_world(p)
+    delta = 1 / p.measurements_per_second
+
+    truth = actual.process.integrate(actual.states, delta, n_steps)
+    return Scenario(delta, truth, actual.sensor.sense_batch(truth))
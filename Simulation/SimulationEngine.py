@@ -0,0 +1,96 @@
+"""
+Headless stepping of one Ball Estimation run.
+"""
+import time
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Optional
+
+from World.WorldInformation import BallWorldInformation
+from Instrumentation import BaseHook
+from .SimulationParameters import SimulationParameters
+from .FilterEngine import FilterEngine
+from .Scenario import build_actual_world
+
+@dataclass
+class StepResult:
+    step: int
+    states: Optional[np.ndarray] # actual ball states (None when replaying a tape without ground truth)
+    observations: list[np.ndarray] # sensed ball positions
+    estimated_states: list[np.ndarray] # estimated ball states
+    observation_missing: bool
+
+class SimulationEngine(FilterEngine):
+    world: BallWorldInformation
+    states: np.ndarray
+    steps: int
+
+    def __init__(self, p: SimulationParameters, hook: Optional[BaseHook] = None):
+        """
+        Set up the actual world, the sensor and the particle filter
+        (with our assumptions about the world).
+
+        Nothing in here draws or waits, so the engine can be stepped as
+        fast as the filter allows (e.g. in batch jobs).
+
+        Parameters:
+          p: parameters of the run
+          hook: optional receiver of per-step (and, through the
+            ParticleSet, per-stage) measurements
+        """
+        super().__init__(p, hook)
+
+        # the actual world
+        actual = build_actual_world(p)
+        self.world = actual.world
+        self.process = actual.process
+        self.sensor = actual.sensor
+        self.states = actual.states
+
+        self.steps = 0
+
+    def step(self, observation_missing: bool = False) -> StepResult:
+        """
+        Advance the simulation by one measurement.
+
+        Parameters:
+          observation_missing: drop this step's observation
+            (particles and estimates are propagated deterministically)
+
+        Returns:
+          the states, observations and estimates of this step
+        """
+        start = time.perf_counter() if self.hook is not None else 0.0
+
+        # sense current state
+        observations = self.sensor.sense(self.states)
+
+        estimated_states = self.update(observations, observation_missing)
+
+        result = StepResult(
+            step = self.steps,
+            states = self.states,
+            observations = observations,
+            estimated_states = estimated_states,
+            observation_missing = observation_missing
+        )
+
+        # actual state update
+        self.states = self.process.transition_array(self.states, self.delta)
+        self.steps += 1
+
+        if self.hook is not None:
+            self.hook.record("step", {
+                "step": result.step,
+                "seconds": time.perf_counter() - start,
+                "observation_missing": observation_missing
+            })
+
+        return result
+
+    def run(self, n_steps: int) -> list[StepResult]:
+        """
+        Do n_steps steps (with all observations present).
+        """
+        return [self.step() for _ in range(n_steps)]
@@ -2,6 +2,7 @@
 Parameters of one Ball Estimation run.
 """
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class SimulationParameters:
@@ -39,4 +40,17 @@ class SimulationParameters:
     show_observations: bool = True
     show_actual_positions: bool = True
     show_summary_plots: bool = False
-    
+
+    resampler: str = "multinomial" # multinomial, systematic, stratified or residual
+    ess_threshold: Optional[float] = None # fraction of particle count, None resamples every step
+    estimator: str = "kmeans" # kmeans, lloyd (warm-started) or grid (histogram peaks)
+    record_directory: Optional[str] = None # stream the trajectories into .npy files here
+    record_particles_every: int = 0 # particle snapshot interval when recording (0: none)
+    observation_gate: Optional[float] = None # only weight particles within this many standard deviations of an observation
+    filter: str = "joint" # joint (one particle set for all balls) or tracked (one particle set per ball)
+    dtype: str = "float64" # float precision of the particle filter (float64 or float32)
+    threads: Optional[int] = None # run transition and observe on chunks in this many threads (None: one thread, no chunks)
+    processes: Optional[int] = None # keep the particles in shared memory, stepped by this many worker processes (None: in process)
+    backend: str = "numpy" # numpy, or fused (one compiled transition and weighting loop, needs numba)
+    live_steps_per_second: Optional[float] = 60 # step rate limit while showing live (None: as fast as the filter runs)
+    tracking_metrics: bool = False # compute TrackingMetrics every step (always done for summary plots or with a hook)
@@ -0,0 +1,108 @@
+"""
+Stream a run's trajectories into .npy files on disk.
+"""
+import os
+import numpy as np
+
+from typing import Optional
+
+from Filter import ParticleSet
+from Storage import NpyStream
+from .SimulationEngine import StepResult
+
+class RingBuffer:
+    capacity: int
+    count: int
+
+    def __init__(self, capacity: int, row_shape: tuple[int, ...], dtype = np.float64):
+        """
+        Fixed size buffer that keeps the last capacity rows.
+        """
+        self.capacity = capacity
+        self.count = 0
+        self._rows = np.empty((capacity,) + tuple(row_shape), dtype=dtype)
+
+    def append(self, row: np.ndarray):
+        self._rows[self.count % self.capacity] = row
+        self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def ordered(self) -> np.ndarray:
+        """
+        The buffered rows, oldest first.
+        """
+        if self.count <= self.capacity:
+            return self._rows[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((self._rows[start:], self._rows[:start]))
+
+    def __iter__(self):
+        return iter(self.ordered())
+
+class TrajectoryRecorder:
+    directory: str
+    streams: dict[str, NpyStream]
+
+    def __init__(self, directory: str, number_of_balls: int, number_of_estimates: int, capacity: Optional[int] = None, particles_every: int = 0, number_of_particles: int = 0):
+        """
+        Record truth, observations, estimates (and optionally particle
+        snapshots) of a run into .npy files in directory.
+
+        Files: truth.npy (T, M, 4), observations.npy (T, M, 2),
+        estimates.npy (T, E, 4), observation_missing.npy (T,) and, if
+        particles_every > 0, particles.npy (S, N, 4) and particle_weights.npy (S, N)
+        with one snapshot every particles_every steps.
+
+        Parameters:
+          directory: where to put the files (created if missing)
+          number_of_balls: actual ball count M
+          number_of_estimates: estimated ball count E
+          capacity: number of steps to preallocate for (None: grow in chunks)
+          particles_every: particle snapshot interval (0: no snapshots)
+          number_of_particles: particle count N (needed for snapshots)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.particles_every = particles_every
+
+        def stream(name, row_shape, dtype = np.float64, rows = capacity):
+            return NpyStream(os.path.join(directory, name + ".npy"), row_shape, dtype, rows)
+
+        self.streams = {
+            "truth": stream("truth", (number_of_balls, 4)),
+            "observations": stream("observations", (number_of_balls, 2)),
+            "estimates": stream("estimates", (number_of_estimates, 4)),
+            "observation_missing": stream("observation_missing", (), np.bool_)
+        }
+        if particles_every > 0:
+            snapshots = None if capacity is None else (capacity + particles_every - 1) // particles_every
+            self.streams["particles"] = stream("particles", (number_of_particles, 4), rows = snapshots)
+            self.streams["particle_weights"] = stream("particle_weights", (number_of_particles,), rows = snapshots)
+
+    def record(self, result: StepResult, particle_set: Optional[ParticleSet] = None):
+        """
+        Append one step.
+        """
+        self.streams["truth"].append(result.states)
+        self.streams["observations"].append(np.asarray(result.observations))
+        self.streams["estimates"].append(np.asarray(result.estimated_states))
+        self.streams["observation_missing"].append(result.observation_missing)
+        if self.particles_every > 0 and particle_set is not None and result.step % self.particles_every == 0:
+            self.streams["particles"].append(np.asarray(particle_set.particles))
+            self.streams["particle_weights"].append(np.asarray(particle_set.weights))
+
+    def close(self):
+        for s in self.streams.values():
+            s.close()
+
+    @staticmethod
+    def load(directory: str) -> dict[str, np.ndarray]:
+        """
+        Memory map the recorded files (read only, nothing is copied).
+        """
+        return {
+            name[:-4]: np.load(os.path.join(directory, name), mmap_mode="r")
+            for name in sorted(os.listdir(directory)) if name.endswith(".npy")
+        }
@@ -1,7 +1,20 @@
 from .SimulationParameters import SimulationParameters
+from .Scenario import Scenario, generate_scenario
+from .FilterEngine import FilterEngine
+from .SimulationEngine import SimulationEngine, StepResult
+from .Replay import ReplayEngine, record_tape
+from .TrajectoryRecorder import TrajectoryRecorder
 from .Simulation import Simulation
 
 __all__: list[str] = [
     "SimulationParameters",
+    "Scenario",
+    "generate_scenario",
+    "FilterEngine",
+    "SimulationEngine",
+    "ReplayEngine",
+    "record_tape",
+    "StepResult",
+    "TrajectoryRecorder",
     "Simulation"
 ]
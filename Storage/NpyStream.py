@@ -0,0 +1,100 @@
+"""
+Append-only .npy files with constant memory use.
+"""
+import numpy as np
+
+from typing import Optional
+
+# room for the header to grow when the final shape is patched in
+_HEADER_LENGTH = 128
+
+def _write_header(f, dtype: np.dtype, shape: tuple[int, ...]):
+    """
+    Write a version 1.0 .npy header padded to _HEADER_LENGTH bytes.
+    """
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape})
+    prefix = np.lib.format.MAGIC_PREFIX + bytes([1, 0])
+    body_length = _HEADER_LENGTH - len(prefix) - 2
+    header = header.ljust(body_length - 1) + "\n"
+    f.seek(0)
+    f.write(prefix + body_length.to_bytes(2, "little") + header.encode("latin1"))
+
+class NpyStream:
+    path: str
+    count: int
+
+    def __init__(self, path: str, row_shape: tuple[int, ...], dtype = np.float64, capacity: Optional[int] = None, chunk_size: int = 1024):
+        """
+        Append-only .npy file of rows with shape row_shape.
+
+        With a capacity, the file is preallocated and memory mapped and rows
+        are written straight into it. Without one, rows are collected in a
+        chunk of chunk_size rows that is appended to the file whenever it is
+        full. Either way memory use does not grow with the number of rows, and
+        close() patches the actual row count into the header.
+
+        Parameters:
+          path: .npy file to write
+          row_shape: shape of one row
+          dtype: data type of the rows
+          capacity: maximum number of rows (None: unbounded)
+          chunk_size: rows buffered in memory (unbounded mode only)
+        """
+        self.path = path
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.count = 0
+
+        self._file = open(path, "w+b")
+        _write_header(self._file, self.dtype, (0,) + self.row_shape)
+
+        if capacity is not None:
+            self._file.truncate(_HEADER_LENGTH + capacity * int(np.prod(self.row_shape, dtype=np.int64)) * self.dtype.itemsize)
+            self._rows = np.memmap(self._file, dtype=self.dtype, mode="r+", offset=_HEADER_LENGTH, shape=(capacity,) + self.row_shape)
+        else:
+            self._rows = np.empty((chunk_size,) + self.row_shape, dtype=self.dtype)
+            self._file.seek(_HEADER_LENGTH)
+        self._buffered = 0
+
+    def append(self, row: np.ndarray):
+        if self.capacity is not None:
+            if self.count >= self.capacity:
+                raise RuntimeError(f"stream {self.path} is full ({self.capacity} rows)")
+            self._rows[self.count] = row
+        else:
+            self._rows[self._buffered] = row
+            self._buffered += 1
+            if self._buffered == len(self._rows):
+                self._flush_chunk()
+        self.count += 1
+
+    def extend(self, rows: np.ndarray):
+        """
+        Append several rows at once.
+        """
+        rows = np.asarray(rows, dtype=self.dtype).reshape((-1,) + self.row_shape)
+        if self.capacity is not None:
+            if self.count + len(rows) > self.capacity:
+                raise RuntimeError(f"stream {self.path} is full ({self.capacity} rows)")
+            self._rows[self.count:self.count + len(rows)] = rows
+        else:
+            self._flush_chunk()
+            self._file.write(rows.tobytes())
+        self.count += len(rows)
+
+    def _flush_chunk(self):
+        self._file.write(self._rows[:self._buffered].tobytes())
+        self._buffered = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.capacity is not None:
+            self._rows.flush()
+            del self._rows
+        else:
+            self._flush_chunk()
+        self._file.truncate(_HEADER_LENGTH + self.count * int(np.prod(self.row_shape, dtype=np.int64)) * self.dtype.itemsize)
+        _write_header(self._file, self.dtype, (self.count,) + self.row_shape)
+        self._file.close()
@@ -0,0 +1,5 @@
+from .NpyStream import NpyStream
+
+__all__: list[str] = [
+    "NpyStream"
+]
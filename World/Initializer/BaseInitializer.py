@@ -3,7 +3,10 @@ The Initializer will be called by the world initialization to
 generate the initial states of the objects.
 """
 
+import numpy as np
+
 from typing import Generic, TypeVar
+from World.RandomStreams import Seed
 
 S = TypeVar('S')
 
@@ -19,7 +22,7 @@ class BaseInitializer(Generic[S]):
         """
         self.default_state = default_state
 
-    def generate(self, n: int, seed: int = 0) -> S:
+    def generate(self, n: int, seed: Seed = 0) -> S:
         """
         Generate a new state.
 
@@ -29,5 +32,23 @@ class BaseInitializer(Generic[S]):
         Parameters:
           n: Object index
           seed: seed to use if the initializer uses random elements
+            (an int seed is offset by n, a Generator is drawn from directly)
         """
         return self.default_state
+
+    def generate_batch(self, count: int, seed: Seed = 0) -> np.ndarray:
+        """
+        Generate the states of objects 0 to count - 1 at once.
+
+        The default stacks count generate calls (the fallback for
+        initializers that only implement generate), subclasses
+        draw all states in one vectorized call.
+
+        Parameters:
+          count: number of objects
+          seed: seed to use if the initializer uses random elements
+
+        Returns:
+          (count, ...) array, one row per object
+        """
+        return np.array([self.generate(n, seed) for n in range(count)])
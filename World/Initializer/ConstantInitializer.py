@@ -1,5 +1,8 @@
+import numpy as np
+
 from .BaseInitializer import BaseInitializer, S
 from typing import Generic
+from World.RandomStreams import Seed
 
 class ConstantInitializer(Generic[S], BaseInitializer[S]):
     default_states: list[S]
@@ -14,10 +17,16 @@ class ConstantInitializer(Generic[S], BaseInitializer[S]):
         """
         self.default_states = default_states
 
-    def generate(self, n: int, seed: int = 0) -> S:
+    def generate(self, n: int, seed: Seed = 0) -> S:
         """
         Output the nth default state. If n is larger than
         the number of states passed in the constructor,
         the default states array is viewed as a ring buffer.
         """
         return self.default_states[n % len(self.default_states)]
+
+    def generate_batch(self, count: int, seed: Seed = 0) -> np.ndarray:
+        """
+        The first count outputs of generate, stacked.
+        """
+        return np.asarray(self.default_states)[np.arange(count) % len(self.default_states)]
@@ -1,4 +1,5 @@
 from .BaseInitializer import BaseInitializer
+from World.RandomStreams import Seed, as_generator
 
 import numpy as np
 
@@ -22,8 +23,18 @@ class RandomBallInitializer(BaseInitializer[np.ndarray]):
         self.mean = mean
         self.covs = covs
 
-    def generate(self, n: int, seed: int = 0) -> np.ndarray:
-        rng = np.random.default_rng(seed = seed + n)
+    def generate(self, n: int, seed: Seed = 0) -> np.ndarray:
+        rng = as_generator(seed, n)
         return rng.multivariate_normal(self.mean, self.covs)
+
+    def generate_batch(self, count: int, seed: Seed = 0) -> np.ndarray:
+        """
+        count ball states drawn in one call.
+
+        With a Generator, this draws the same states as count consecutive
+        generate calls (an int seed is not offset per object).
+        """
+        rng = as_generator(seed)
+        return rng.multivariate_normal(self.mean, self.covs, size = count)
         
 
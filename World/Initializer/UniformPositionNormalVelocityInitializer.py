@@ -1,5 +1,6 @@
 from .BaseInitializer import BaseInitializer
 from World import BallWorldInformation
+from World.RandomStreams import Seed, as_generator
 
 import numpy as np
 
@@ -17,9 +18,20 @@ class UniformPositionNormalVelocityInitializer(BaseInitializer[np.ndarray]):
         if velocity_variance.shape != (2,2):
             raise RuntimeError(f"velocity variance must be shape (2,2), got {velocity_variance.shape}")
 
-    def generate(self, n: int, seed: int = 0) -> np.ndarray:
-        rng = np.random.default_rng(seed = seed + n)
+    def generate(self, n: int, seed: Seed = 0) -> np.ndarray:
+        rng = as_generator(seed, n)
         position_x = rng.random() * self.world.width
         position_y = rng.random() * self.world.height
         vel = rng.multivariate_normal([0,0], self.velocity_variance)
         return np.array([position_x, position_y, vel[0], vel[1]])
+
+    def generate_batch(self, count: int, seed: Seed = 0) -> np.ndarray:
+        """
+        count ball states drawn in one call per distribution
+        (all positions first, then all velocities).
+        """
+        rng = as_generator(seed)
+        states = np.empty((count, 4))
+        states[:, :2] = rng.random((count, 2)) * [self.world.width, self.world.height]
+        states[:, 2:] = rng.multivariate_normal([0,0], self.velocity_variance, size = count)
+        return states
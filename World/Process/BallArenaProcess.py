@@ -1,7 +1,65 @@
 import numpy as np
+from typing import Optional
 
 from World import BallWorldInformation
 from .IdentityProcess import IdentityProcess
+from World.RandomStreams import Seed
+
+def ball_arena_transition(states: np.ndarray, delta: float, w: BallWorldInformation, tol: float = 1e-4) -> np.ndarray:
+    """
+    Transition ball states in place, along the last axis ([pos_x, pos_y, vel_x, vel_y]).
+
+    Same physics as BallArenaProcess._transition_one, the wall collisions and
+    the ground friction are applied as masked array operations.
+
+    The fields of w may be arrays that broadcast against states[..., 0]
+    (e.g. shape (K, 1) for a (K, N, 4) stack of K particle sets that
+    each assume a different world).
+
+    Returns:
+      states
+    """
+    x = states[..., 0]
+    y = states[..., 1]
+    vx = states[..., 2]
+    vy = states[..., 3]
+
+    x += vx * delta
+    y += vy * delta
+
+    # top collision
+    hit = y + w.ball_radius > w.height
+    y[...] = np.where(hit, w.height - w.ball_radius, y)
+    vy[...] = np.where(hit, -vy * w.bounce_discount, vy)
+
+    # bottom collision
+    hit = y - w.ball_radius < 0
+    y[...] = np.where(hit, w.ball_radius, y)
+    vy[...] = np.where(hit, -vy * w.bounce_discount, vy)
+
+    # right collision
+    hit = x + w.ball_radius > w.width
+    x[...] = np.where(hit, w.width - w.ball_radius, x)
+    vx[...] = np.where(hit, -vx * w.bounce_discount, vx)
+
+    # left collision
+    hit = x - w.ball_radius < 0
+    x[...] = np.where(hit, w.ball_radius, x)
+    vx[...] = np.where(hit, -vx * w.bounce_discount, vx)
+
+    # air resistance
+    air = w.air_discount ** delta
+    vx *= air
+    vy *= air
+    vy -= w.gravity * delta
+
+    # ground friction
+    on_ground = np.abs(y - w.ball_radius - 0) < tol
+    ground = w.ground_discount ** delta
+    vx[...] = np.where(on_ground, vx * ground, vx)
+    vy[...] = np.where(on_ground, vy * ground, vy)
+
+    return states
 
 class BallArenaProcess(IdentityProcess[np.ndarray]):
     world_information: BallWorldInformation
@@ -22,8 +80,10 @@ class BallArenaProcess(IdentityProcess[np.ndarray]):
         if state.shape != (4,):
             raise RuntimeWarning("ball state must consist of (pos_x, pos_y, vel_x, vel_y)")
 
-        pos = state[:2].astype(float)
-        vel = state[2:].astype(float)
+        # float32 states stay float32, anything else is computed in float64
+        dtype = np.result_type(state.dtype, np.float32)
+        pos = state[:2].astype(dtype)
+        vel = state[2:].astype(dtype)
 
         pos += vel * delta
 
@@ -56,9 +116,55 @@ class BallArenaProcess(IdentityProcess[np.ndarray]):
             vel = vel * (self.world_information.ground_discount ** delta)
 
         return np.concatenate((pos, vel))
+
+    def transition_array(self, states: np.ndarray, delta: float = 1, seed: Seed = 0, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Transition an (N, 4) array of ball states ([pos_x, pos_y, vel_x, vel_y])
+        for one time step.
+
+        Does the same as _transition_one for every row, but the wall collisions
+        and the ground friction are applied as masked array operations.
+
+        Parameters:
+          out: optional (N, 4) float array to write the result into,
+            passing states itself transitions in place
+
+        Returns:
+          contiguous (N, 4) float array (a new one, unless out is given),
+          float32 states stay float32
+        """
+        if out is None:
+            states = np.asarray(states)
+            out = np.array(states, dtype=np.result_type(states.dtype, np.float32)).reshape(-1, 4)
+        elif out is not states:
+            out[...] = states
+
+        ball_arena_transition(out, delta, self.world_information, self.tol)
+
+        return out
         
-    def transition(self, states: list[np.ndarray], delta: float = 1, seed: int = 0) -> list[np.ndarray]:
+    def integrate(self, states: np.ndarray, delta: float, steps: int) -> np.ndarray:
+        """
+        Trajectory of an (M, 4) array of ball states over several time steps.
+
+        Every step is one transition_array call over all balls, written
+        straight into the preallocated trajectory.
+
+        Returns:
+          (steps, M, 4) array, row t holds the states after t transitions
+          (row 0 is a copy of states)
+        """
+        states = np.asarray(states, dtype=float).reshape(-1, 4)
+        trajectory = np.empty((steps,) + states.shape)
+        if steps == 0:
+            return trajectory
+        trajectory[0] = states
+        for t in range(1, steps):
+            self.transition_array(trajectory[t - 1], delta, out = trajectory[t])
+        return trajectory
+
+    def transition(self, states: list[np.ndarray], delta: float = 1, seed: Seed = 0) -> list[np.ndarray]:
         """
         Transition ball states ([pos_x, pos_y, vel_x, vel_y]) for one time step.
         """
-        return [self._transition_one(s, delta) for s in states]
+        return list(self.transition_array(np.array(states), delta, seed))
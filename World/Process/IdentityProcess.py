@@ -2,7 +2,9 @@
 The World's 'Process' is the state transition function.
 This is where the state is updated.
 """
-from typing import Generic, TypeVar
+import numpy as np
+from typing import Generic, TypeVar, Optional
+from World.RandomStreams import Seed
 
 S = TypeVar('S')
 
@@ -15,9 +17,23 @@ class IdentityProcess(Generic[S]):
         """
         pass
 
-    def transition(self, states: list[S], delta: float = 1, seed: int = 0) -> list[S]:
+    def transition(self, states: list[S], delta: float = 1, seed: Seed = 0) -> list[S]:
         """
         Takes in a list of states and a time delta and produces
         a list of the transitioned states.
         """
         return states
+
+    def transition_array(self, states: np.ndarray, delta: float = 1, seed: Seed = 0, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Like transition, but the states are stacked into one array
+        (one row per state) and an array of the same shape is returned.
+
+        Parameters:
+          out: optional array to write the result into (may be states itself)
+        """
+        if out is None:
+            return states
+        if out is not states:
+            out[...] = states
+        return out
@@ -1,5 +1,7 @@
 import numpy as np
+from typing import Optional
 from .BallArenaProcess import BallArenaProcess
+from World.RandomStreams import Seed
 
 class StochasticBallArenaProcess(BallArenaProcess):
     internal_process: BallArenaProcess
@@ -20,17 +22,21 @@ class StochasticBallArenaProcess(BallArenaProcess):
         self.internal_process = ball_arena_process
         self.vel_variance = velocity_variance
 
-    def transition(self, states: list[np.ndarray], delta: float = 1, seed: int = 0):
+    def transition_array(self, states: np.ndarray, delta: float = 1, seed: Seed = 0, out: Optional[np.ndarray] = None) -> np.ndarray:
         # pre-modify velocities by normal dist
-        velocities = np.array(states)[:,2:]
-        
-        rng = np.random.default_rng(seed = seed)
+        if out is None:
+            states = np.asarray(states)
+            npstates = np.array(states, dtype=np.result_type(states.dtype, np.float32)).reshape(-1, 4)
+        else:
+            npstates = out
+            if out is not states:
+                npstates[...] = states
 
-        incs = rng.multivariate_normal(np.zeros(2), np.diag(self.vel_variance), size = len(states))
+        rng = np.random.default_rng(seed = seed) # a Generator is used as it is
 
-        npstates = np.array(states)
-        npstates[:,2:] = velocities + incs
-        
-        seed += len(states)
+        npstates[:,2:] += rng.multivariate_normal(np.zeros(2), np.diag(self.vel_variance), size = len(npstates))
 
-        return self.internal_process.transition(list(npstates), delta, seed)
+        return self.internal_process.transition_array(npstates, delta, seed, out = npstates)
+
+    def transition(self, states: list[np.ndarray], delta: float = 1, seed: Seed = 0):
+        return list(self.transition_array(np.array(states), delta, seed))
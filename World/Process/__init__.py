@@ -1,9 +1,10 @@
 from .IdentityProcess import IdentityProcess 
-from .BallArenaProcess import BallArenaProcess
+from .BallArenaProcess import BallArenaProcess, ball_arena_transition
 from .StochasticBallArenaProcess import StochasticBallArenaProcess
 
 __all__: list[str] = [
     "IdentityProcess",
     "BallArenaProcess",
+    "ball_arena_transition",
     "StochasticBallArenaProcess"
 ]
@@ -0,0 +1,75 @@
+"""
+Long-lived random number streams, derived from one seed.
+"""
+import zlib
+import numpy as np
+
+from typing import Union
+
+# anything np.random.default_rng accepts as seed: an int builds a new
+# Generator, a Generator is used as it is (and keeps its state between calls)
+Seed = Union[int, np.random.Generator]
+
+def as_generator(seed: Seed, offset: int = 0) -> np.random.Generator:
+    """
+    The Generator to draw from for seed.
+
+    Parameters:
+      seed: a Generator (returned as it is) or an int seed
+      offset: added to int seeds (the per-call seed offsets of the
+        seed-based interfaces, e.g. the object index of an initializer)
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed + offset)
+
+class RandomStreams:
+    sequence: np.random.SeedSequence
+
+    def __init__(self, seed: int = 0, key: tuple[int, ...] = ()):
+        """
+        Named, statistically independent random streams of one run.
+
+        Every stream is a Generator that lives as long as this object, so
+        consecutive draws continue the stream instead of re-seeding a new
+        Generator with a shifted seed on every call (those shifted seeds
+        give overlapping streams). Streams are derived with the SeedSequence
+        spawn mechanism: the same seed and names always give the same
+        streams, no matter in which order (or in which process) they are
+        requested, and different names give independent streams.
+
+        Parameters:
+          seed: root seed of the run
+          key: spawn key below the root (see child and spawn)
+        """
+        self.seed = seed
+        self.key = key
+        self.sequence = np.random.SeedSequence(seed, spawn_key = key)
+        self._generators: dict[str, np.random.Generator] = {}
+
+    @staticmethod
+    def _name_key(name: str) -> tuple[int, int]:
+        # tagged, so names never collide with the indices of spawn
+        return (0, zlib.crc32(name.encode()))
+
+    def generator(self, name: str) -> np.random.Generator:
+        """
+        The stream of component name (created on first use).
+        """
+        if name not in self._generators:
+            sequence = np.random.SeedSequence(self.seed, spawn_key = self.key + self._name_key(name))
+            self._generators[name] = np.random.Generator(np.random.PCG64(sequence))
+        return self._generators[name]
+
+    def child(self, name: str) -> "RandomStreams":
+        """
+        Independent streams for a sub-component (e.g. the filter of a run).
+        """
+        return RandomStreams(self.seed, self.key + self._name_key(name))
+
+    def spawn(self, n: int) -> list["RandomStreams"]:
+        """
+        n independent streams, e.g. one per parallel worker or per
+        batched filter. Child i is the same whatever n is.
+        """
+        return [RandomStreams(self.seed, self.key + (1, i)) for i in range(n)]
@@ -2,7 +2,8 @@
 Actual or assumed world parameters.
 """
 
-from dataclasses import dataclass
+import numpy as np
+from dataclasses import dataclass, fields
 
 @dataclass
 class BallWorldInformation:
@@ -13,3 +14,13 @@ class BallWorldInformation:
     bounce_discount: float
     air_discount: float
     ground_discount: float
+
+def stack_world_information(worlds: list[BallWorldInformation]) -> BallWorldInformation:
+    """
+    Combine K worlds into one whose fields are (K, 1) arrays,
+    so they broadcast against a (K, N) stack of particle components.
+    """
+    return BallWorldInformation(**{
+        f.name: np.array([getattr(w, f.name) for w in worlds], dtype=float).reshape(-1, 1)
+        for f in fields(BallWorldInformation)
+    })
@@ -1,4 +1,9 @@
-from .WorldInformation import BallWorldInformation
+from .WorldInformation import BallWorldInformation, stack_world_information
+from .RandomStreams import RandomStreams, Seed, as_generator
 __all__: list[str] = [
-    "BallWorldInformation"
+    "BallWorldInformation",
+    "stack_world_information",
+    "RandomStreams",
+    "Seed",
+    "as_generator"
 ]
@@ -0,0 +1,92 @@
+"""
+Benchmark the condensation stages headless.
+
+Examples:
+  python __benchmark__.py --particles 1000,10000,100000,1000000 --balls 1,5,20,50 --output bench.json
+  python __benchmark__.py --particles 10000 --balls 3 --output new.json --compare bench.json
+  python __benchmark__.py --startup --output startup.json
+  python __benchmark__.py --precision --particles 2000,20000 --balls 3 --output precision.json
+  python __benchmark__.py --particles 1000000 --balls 3 --backend fused
+  python __benchmark__.py --conformance --particles 10000 --balls 1,3,10
+"""
+import argparse
+import sys
+
+from Benchmark import run_benchmarks, save_results, load_results, compare_results, benchmark_startup, save_startup_results, compare_precision, save_precision_results, check_backends
+from Benchmark.StageBenchmark import STAGES
+from Simulation import SimulationParameters
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the particle filter stages.")
+    parser.add_argument("--particles", default="1000,10000,100000,1000000", help="comma separated particle counts")
+    parser.add_argument("--balls", default="1,5,20,50", help="comma separated ball counts")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated stages")
+    parser.add_argument("--estimator", default="kmeans", help="kmeans, lloyd or grid")
+    parser.add_argument("--repeats", type=int, default=5, help="timed calls per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json", help="json file to write the results to")
+    parser.add_argument("--compare", default=None, help="baseline json file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown counted as regression")
+    parser.add_argument("--startup", action="store_true", help="measure start-up time of short headless runs instead")
+    parser.add_argument("--precision", action="store_true", help="compare float32 against float64 tracking accuracy instead")
+    parser.add_argument("--steps", type=int, default=300, help="steps per run of the precision report")
+    parser.add_argument("--seeds", default="0,1,2", help="comma separated seeds of the precision report")
+    parser.add_argument("--backend", default="numpy", help="numpy or fused")
+    parser.add_argument("--conformance", action="store_true", help="check that the fused backend agrees with the numpy stages instead")
+    args = parser.parse_args()
+
+    if args.conformance:
+        failed = False
+        for n in [int(n) for n in args.particles.split(",")]:
+            for m in [int(m) for m in args.balls.split(",")]:
+                r = check_backends(n, m, args.steps, args.seed)
+                print(f"N={r.particles:<8} M={r.balls:<3} state deviation {r.state_deviation:.3g} weight deviation {r.weight_deviation:.3g} {'ok' if r.passed else 'FAILED'}")
+                failed = failed or not r.passed
+        if failed:
+            sys.exit(1)
+        return
+
+    if args.precision:
+        results = []
+        for n in [int(n) for n in args.particles.split(",")]:
+            for m in [int(m) for m in args.balls.split(",")]:
+                p = SimulationParameters(number_of_balls = m, assumed_number_of_balls = m, number_of_particles = n, max_steps = args.steps, estimator = args.estimator)
+                for r in compare_precision(p, [int(s) for s in args.seeds.split(",")]):
+                    print(f"N={r.particles:<8} M={r.balls:<3} seed={r.seed:<3} error f64 {r.error_float64:7.3f} f32 {r.error_float32:7.3f} deviation {r.estimate_deviation:7.3f} step f64 {r.seconds_float64*1000:8.3f}ms f32 {r.seconds_float32*1000:8.3f}ms non-finite {r.non_finite_weights}")
+                    results.append(r)
+        save_precision_results(args.output, results)
+        return
+
+    if args.startup:
+        results = []
+        for estimator in ("lloyd", "grid", "kmeans"):
+            r = benchmark_startup(estimator, repeats = args.repeats)
+            print(f"{r.estimator:>8} process {r.process_seconds*1000:8.1f}ms import {r.import_seconds*1000:8.1f}ms run {r.run_seconds*1000:8.1f}ms heavy modules: {', '.join(r.heavy_modules) or '-'}")
+            results.append(r)
+        save_startup_results(args.output, results)
+        return
+
+    def log(r):
+        print(f"{r.stage:>10} N={r.particles:<8} M={r.balls:<3} {r.seconds*1000:10.3f}ms {r.throughput:14.0f} particles/s {r.peak_memory/2**20:9.2f}MiB")
+
+    results = run_benchmarks(
+        [int(n) for n in args.particles.split(",")],
+        [int(m) for m in args.balls.split(",")],
+        args.stages.split(","),
+        args.repeats,
+        args.seed,
+        args.estimator,
+        log,
+        args.backend
+    )
+    save_results(args.output, results, seed = args.seed, estimator = args.estimator, repeats = args.repeats, backend = args.backend)
+
+    if args.compare is not None:
+        regressions = compare_results(load_results(args.compare), results, args.tolerance)
+        for (old, new) in regressions:
+            print(f"REGRESSION {new.stage} N={new.particles} M={new.balls}: {old.seconds*1000:.3f}ms -> {new.seconds*1000:.3f}ms")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Headless parameter sweep over SimulationParameters.
+
+Examples:
+  python __sweep__.py --param number_of_particles=500,1000,2000 --param transition_velocity_variance=1/1,2/2 --seeds 0,1,2
+  python __sweep__.py --random 100 --range assumed_gravity=8:12 --range assumed_sensor_variance=1:10 --workers 16
+"""
+import argparse
+from typing import get_args, get_origin
+
+from Simulation import SimulationParameters
+from Simulation.ParameterSweep import grid, parameter_type, random_sample, run_sweep
+
+def parse_value(name: str, text: str):
+    """
+    Parse text into the annotated type of parameter name.
+    Tuples (variances) are written as x/y (a single value is used for both).
+    """
+    kind = parameter_type(name)
+    if kind is bool:
+        return text.lower() in ("1", "true", "yes")
+    if kind is int:
+        return int(text)
+    if kind is float:
+        return float(text)
+    if get_origin(kind) is tuple:
+        size = len(get_args(kind))
+        parts = [float(v) for v in text.split("/")]
+        return tuple(parts) if len(parts) == size else (parts[0],) * size
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description = "Run a headless parameter sweep.")
+    parser.add_argument("--param", action="append", default=[], help="name=v1,v2,... grid axis")
+    parser.add_argument("--random", type=int, default=0, help="draw this many random parameter sets instead of a grid")
+    parser.add_argument("--range", action="append", default=[], help="name=low:high range for --random")
+    parser.add_argument("--seeds", default="0", help="comma separated seeds to run each parameter set with")
+    parser.add_argument("--steps", type=int, default=None, help="steps per run (default: max_steps)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default="sweep_results.csv", help="csv file to stream the results into")
+    args = parser.parse_args()
+
+    base = SimulationParameters(live_show = False)
+    if args.steps is not None:
+        base.max_steps = args.steps
+
+    if args.random > 0:
+        ranges = {}
+        for r in args.range:
+            name, bounds = r.split("=")
+            low, high = bounds.split(":")
+            ranges[name] = (float(low), float(high))
+        parameters = random_sample(base, ranges, args.random)
+    else:
+        axes = {}
+        for a in args.param:
+            name, values = a.split("=")
+            axes[name] = [parse_value(name, v) for v in values.split(",")]
+        parameters = grid(base, axes)
+
+    seeds = [int(s) for s in args.seeds.split(",")]
+    total = len(parameters) * len(seeds)
+    for (done, row) in enumerate(run_sweep(parameters, seeds, args.workers, args.output), start=1):
+        if "error" in row:
+            print(f"[{done}/{total}] seed={row['seed']} failed: {row['error']}")
+            continue
+        print(f"[{done}/{total}] seed={row['seed']} error={row['tracking_error']:.3f} rmse={row['position_rmse']:.3f} ospa={row['ospa']:.3f} swaps={row['track_swaps']} step={row['runtime_per_step']*1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
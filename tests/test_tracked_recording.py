@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from Simulation import Simulation, SimulationParameters, FilterEngine, TrajectoryRecorder
+
+def test_tracked_filter_records_particles_when_tracks_do_not_divide_the_count(tmp_path):
+    p = SimulationParameters(
+        live_show = False,
+        filter = "tracked",
+        number_of_particles = 1000,
+        assumed_number_of_balls = 3,
+        max_steps = 5,
+        record_directory = str(tmp_path),
+        record_particles_every = 2
+    )
+    Simulation(p).run()
+
+    recorded = TrajectoryRecorder.load(str(tmp_path))
+    assert recorded["particles"].shape[1:] == (999, 4)
+    assert np.all(np.isfinite(recorded["particles"]))
+
+@pytest.mark.parametrize("option", [{"estimator": "lloyd"}, {"threads": 2}, {"backend": "fused"}, {"processes": 2}])
+def test_tracked_filter_rejects_joint_filter_options(option):
+    with pytest.raises(ValueError):
+        FilterEngine(SimulationParameters(live_show = False, filter = "tracked", **option))